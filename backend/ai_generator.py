@@ -1,6 +1,25 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Generator, Iterator, List, Optional, Sequence, Tuple
 
 import anthropic
+import httpx
+
+# Process-wide connection pools shared by every AIGenerator, so concurrent
+# requests reuse keep-alive TLS connections instead of re-handshaking
+_HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=20, max_connections=100, keepalive_expiry=30.0
+)
+_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+_HTTP_CLIENT = anthropic.DefaultHttpxClient(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+_ASYNC_HTTP_CLIENT = anthropic.DefaultAsyncHttpxClient(
+    limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT
+)
+
+# Shared by every tool-enabled request; read-only so no call can alter it
+_TOOL_CHOICE_AUTO = MappingProxyType({"type": "auto"})
 
 
 class AIGenerator:
@@ -39,12 +58,45 @@ All responses must be:
 Provide only the direct answer to what was asked.
 """
 
+    # System prompt as a single cacheable block, identical for every request
+    SYSTEM_BLOCKS = (
+        {
+            "type": "text",
+            "text": SYSTEM_PROMPT,
+            "cache_control": {"type": "ephemeral"},
+        },
+    )
+
+    # Beta that trims tool-call output tokens; Claude 4 models have it built in
+    TOKEN_EFFICIENT_TOOLS_BETA = "token-efficient-tools-2025-02-19"
+
+    # Maximum number of sequential tool-calling rounds per query
+    MAX_TOOL_ROUNDS = 2
+
+    # Output budget for the tool-less synthesis call after the last round
+    FINAL_MAX_TOKENS = 600
+
+    # Seconds between status checks while a message batch is processing
+    BATCH_POLL_INTERVAL = 10.0
+
+    # Answer used when the final response carries no text block
+    NO_TEXT_RESPONSE = "I couldn't produce an answer to that. Please try rephrasing it."
+
     def __init__(self, api_key: str, model: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = anthropic.Anthropic(api_key=api_key, http_client=_HTTP_CLIENT)
+        self.async_client = anthropic.AsyncAnthropic(
+            api_key=api_key, http_client=_ASYNC_HTTP_CLIENT
+        )
         self.model = model
+        self.token_efficient_tools = "claude-3-7" in model
 
-        # Pre-build base API parameters
-        self.base_params = {"model": self.model, "temperature": 0, "max_tokens": 800}
+        # Last tool definitions seen and their cache-marked copy
+        self._cached_tools: Tuple[Any, List] = (None, [])
+
+        # Pre-build base API parameters, read-only since every request shares them
+        self.base_params = MappingProxyType(
+            {"model": self.model, "temperature": 0, "max_tokens": 800}
+        )
 
     def generate_response(
         self,
@@ -65,96 +117,297 @@ Provide only the direct answer to what was asked.
         Returns:
             Generated response as string
         """
+        api_params = self._build_api_params(query, conversation_history, tools)
+
+        # Get response from Claude
+        response = self._create_message(**api_params)
+
+        # Handle tool execution if needed
+        if response.stop_reason == "tool_use" and tool_manager:
+            return self._handle_tool_execution(response, api_params, tool_manager)
+
+        # Return direct response
+        return self._response_text(response)
+
+    async def generate_response_async(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+    ) -> str:
+        """
+        Async variant of generate_response using the AsyncAnthropic client.
+
+        Tool calls issued together in one round are executed concurrently.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+
+        Returns:
+            Generated response as string
+        """
+        api_params = self._build_api_params(query, conversation_history, tools)
+
+        response = await self._create_message_async(**api_params)
+
+        if response.stop_reason == "tool_use" and tool_manager:
+            return await self._handle_tool_execution_async(
+                response, api_params, tool_manager
+            )
+
+        return self._response_text(response)
+
+    def generate_response_stream(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+    ) -> Iterator[str]:
+        """
+        Generate AI response as a stream of text chunks.
+
+        The initial call is made without streaming so a tool_use turn can be
+        detected before anything is sent; every call after tool results is
+        streamed, so the synthesis turn reaches the client token by token.
+        Any text Claude writes ahead of a further tool call is streamed too.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+
+        Yields:
+            Chunks of the generated response text
+        """
+        api_params = self._build_api_params(query, conversation_history, tools)
+
+        # Without tools there is nothing to detect; stream straight away
+        if not tools or not tool_manager:
+            yield from self._stream_message(api_params)
+            return
+
+        current_response = self._create_message(**api_params)
+        if current_response.stop_reason != "tool_use":
+            yield self._response_text(current_response)
+            return
+
+        messages = api_params["messages"]
+        rounds_completed = 0
+        while (
+            rounds_completed < self.MAX_TOOL_ROUNDS
+            and current_response.stop_reason == "tool_use"
+        ):
+            messages.append({"role": "assistant", "content": current_response.content})
+
+            tool_results = self._execute_tools(current_response, tool_manager)
+            if tool_results:
+                messages.append({"role": "user", "content": tool_results})
+
+            rounds_completed += 1
+
+            next_params = self._next_round_params(api_params, rounds_completed)
+            current_response = yield from self._stream_message(next_params)
+
+    def generate_responses_batch(self, queries: List[str]) -> List[str]:
+        """
+        Answer independent queries through the Message Batches API.
 
-        # Build system content efficiently - avoid string ops when possible
-        system_content = (
-            f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
-            if conversation_history
-            else self.SYSTEM_PROMPT
+        Meant for non-interactive workloads such as evaluation runs: batched
+        requests are billed at half price but complete asynchronously, so
+        this blocks until the whole batch has ended. Tools are not offered
+        since tool calls cannot be executed mid-batch.
+
+        Args:
+            queries: The questions to answer, each without conversation history
+
+        Returns:
+            Responses in the same order as queries; empty for failed requests
+        """
+        batch = self.client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": str(i),
+                    "params": self._build_api_params(query, None, None),
+                }
+                for i, query in enumerate(queries)
+            ]
         )
 
+        while batch.processing_status != "ended":
+            time.sleep(self.BATCH_POLL_INTERVAL)
+            batch = self.client.messages.batches.retrieve(batch.id)
+
+        # Results are not guaranteed to come back in request order
+        responses = [""] * len(queries)
+        for entry in self.client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                responses[int(entry.custom_id)] = entry.result.message.content[0].text
+        return responses
+
+    def _stream_message(self, params: Dict[str, Any]) -> Generator[str, None, Any]:
+        """Stream a message's text, returning the final message once complete"""
+        if self.token_efficient_tools and "tools" in params:
+            stream_manager = self.client.beta.messages.stream(
+                betas=[self.TOKEN_EFFICIENT_TOOLS_BETA], **params
+            )
+        else:
+            stream_manager = self.client.messages.stream(**params)
+
+        with stream_manager as stream:
+            yield from stream.text_stream
+            return stream.get_final_message()
+
+    def _build_api_params(
+        self,
+        query: str,
+        conversation_history: Optional[str],
+        tools: Optional[List],
+    ) -> Dict[str, Any]:
+        """Build the parameters for the initial API call"""
+        # History goes in the user turn, not the system prompt, so the cached
+        # system prefix stays byte-identical across every session
+        content: Any = query
+        if conversation_history:
+            content = [
+                self._history_block(conversation_history),
+                {"type": "text", "text": query},
+            ]
+
         # Prepare API call parameters efficiently
         api_params = {
             **self.base_params,
-            "messages": [{"role": "user", "content": query}],
-            "system": system_content,
+            "messages": [{"role": "user", "content": content}],
+            "system": self.SYSTEM_BLOCKS,
         }
 
-        # Add tools if available
+        # Add tools if available, caching the tool definitions block as well
         if tools:
-            api_params["tools"] = tools
-            api_params["tool_choice"] = {"type": "auto"}
+            api_params["tools"] = self._with_cached_tools(tools)
+            api_params["tool_choice"] = _TOOL_CHOICE_AUTO
 
-        # Get response from Claude
-        response = self.client.messages.create(**api_params)
+        return api_params
 
-        # Handle tool execution if needed
-        if response.stop_reason == "tool_use" and tool_manager:
-            return self._handle_tool_execution(
-                response, api_params, tool_manager, tools
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _history_block(conversation_history: str) -> Dict[str, str]:
+        """Build the conversation history content block, memoized per history"""
+        # Shared between calls with the same history; must not be mutated
+        return {
+            "type": "text",
+            "text": (
+                f"<conversation_history>\n{conversation_history}\n"
+                "</conversation_history>"
+            ),
+        }
+
+    def _create_message(self, **params):
+        """Create a message, via the token-efficient tools beta when supported"""
+        if self.token_efficient_tools and "tools" in params:
+            return self.client.beta.messages.create(
+                betas=[self.TOKEN_EFFICIENT_TOOLS_BETA], **params
             )
+        return self.client.messages.create(**params)
 
-        # Return direct response
-        return response.content[0].text
+    async def _create_message_async(self, **params):
+        """Async counterpart of _create_message"""
+        if self.token_efficient_tools and "tools" in params:
+            return await self.async_client.beta.messages.create(
+                betas=[self.TOKEN_EFFICIENT_TOOLS_BETA], **params
+            )
+        return await self.async_client.messages.create(**params)
+
+    def _with_cached_tools(self, tools: Sequence[Dict[str, Any]]) -> List:
+        """Return tools with a cache breakpoint on the last definition"""
+        # RAGSystem passes its shared ToolManager's definitions on every query,
+        # per-query managers included, so the marked-up copy is reused until
+        # a different definitions object arrives
+        source, cached = self._cached_tools
+        if source is not tools:
+            # Copy the last definition so the caller's tools are left untouched
+            cached = [
+                *tools[:-1],
+                {**tools[-1], "cache_control": {"type": "ephemeral"}},
+            ]
+            self._cached_tools = (tools, cached)
+        return cached
+
+    @classmethod
+    def _response_text(cls, response) -> str:
+        """Text of a response's first text block, or a fallback if it has none"""
+        for block in response.content:
+            if getattr(block, "type", "text") == "text":
+                return block.text
+        return cls.NO_TEXT_RESPONSE
+
+    @staticmethod
+    def _tool_result(content_block, result: Any) -> Dict[str, Any]:
+        """Build a tool_result block, flagging exceptions as errors"""
+        if isinstance(result, Exception):
+            # Handle tool execution errors gracefully
+            return {
+                "type": "tool_result",
+                "tool_use_id": content_block.id,
+                "content": f"Error executing tool: {str(result)}",
+                "is_error": True,
+            }
+        return {
+            "type": "tool_result",
+            "tool_use_id": content_block.id,
+            "content": result,
+        }
+
+    def _next_round_params(
+        self, params: Dict[str, Any], rounds_completed: int
+    ) -> Dict[str, Any]:
+        """Update the request parameters in place for the call after a tool round"""
+        # Model, system, tools and the (already extended) message list carry
+        # over unchanged until the limit is reached; the final call can only
+        # answer in prose, so it drops the tool offer and gets a tighter budget
+        if rounds_completed >= self.MAX_TOOL_ROUNDS:
+            params.pop("tools", None)
+            params.pop("tool_choice", None)
+            params["max_tokens"] = self.FINAL_MAX_TOKENS
+
+        return params
 
     def _handle_tool_execution(
         self,
         initial_response,
         base_params: Dict[str, Any],
         tool_manager,
-        tools: Optional[List],
     ):
         """
         Handle execution of tool calls with support for sequential rounds (max 2).
 
         Args:
             initial_response: The response containing tool use requests
-            base_params: Base API parameters
+            base_params: API parameters of the initial call, reused each round
             tool_manager: Manager to execute tools
-            tools: Available tools for Claude to use
 
         Returns:
             Final response text after tool execution
         """
-        # Start with existing messages
-        messages = base_params["messages"].copy()
+        # Extend the initial message list in place; callers don't reuse it
+        messages = base_params["messages"]
         current_response = initial_response
         rounds_completed = 0
-        MAX_ROUNDS = 2
 
-        # Loop for up to MAX_ROUNDS of tool calls
+        # Loop for up to MAX_TOOL_ROUNDS of tool calls
         while (
-            rounds_completed < MAX_ROUNDS and current_response.stop_reason == "tool_use"
+            rounds_completed < self.MAX_TOOL_ROUNDS
+            and current_response.stop_reason == "tool_use"
         ):
             # Add AI's tool use response
             messages.append({"role": "assistant", "content": current_response.content})
 
             # Execute all tool calls and collect results
-            tool_results = []
-            for content_block in current_response.content:
-                if content_block.type == "tool_use":
-                    try:
-                        tool_result = tool_manager.execute_tool(
-                            content_block.name, **content_block.input
-                        )
-
-                        tool_results.append(
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": content_block.id,
-                                "content": tool_result,
-                            }
-                        )
-                    except Exception as e:
-                        # Handle tool execution errors gracefully
-                        tool_results.append(
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": content_block.id,
-                                "content": f"Error executing tool: {str(e)}",
-                                "is_error": True,
-                            }
-                        )
+            tool_results = self._execute_tools(current_response, tool_manager)
 
             # Add tool results as single message
             if tool_results:
@@ -162,20 +415,100 @@ Provide only the direct answer to what was asked.
 
             rounds_completed += 1
 
-            # Prepare next API call with tools enabled (allowing another round)
-            next_params = {
-                **self.base_params,
-                "messages": messages.copy(),  # Copy to preserve snapshot for testing/debugging
-                "system": base_params["system"],
-            }
+            # Get next response, allowing another round if under the limit
+            next_params = self._next_round_params(base_params, rounds_completed)
+            current_response = self._create_message(**next_params)
 
-            # Include tools for potential next round if we haven't hit max
-            if rounds_completed < MAX_ROUNDS and tools:
-                next_params["tools"] = tools
-                next_params["tool_choice"] = {"type": "auto"}
+        # Extract and return final text response
+        return self._response_text(current_response)
 
-            # Get next response
-            current_response = self.client.messages.create(**next_params)
+    def _execute_tools(self, response, tool_manager) -> List[Dict[str, Any]]:
+        """Execute every tool call in a response and collect tool_result blocks"""
+        tool_blocks = [block for block in response.content if block.type == "tool_use"]
+        results = self._run_tools(tool_manager, tool_blocks)
+        return [
+            self._tool_result(block, result)
+            for block, result in zip(tool_blocks, results, strict=True)
+        ]
 
-        # Extract and return final text response
-        return current_response.content[0].text
+    @staticmethod
+    def _run_tools(tool_manager, tool_blocks) -> List[Any]:
+        """
+        Run tool calls as one batch, returning each result or its exception.
+
+        Batching lets all of a round's searches share one vector store round
+        trip. Malformed inputs (e.g. None) come back as per-call errors.
+        """
+        try:
+            return tool_manager.execute_tools_batch(
+                [(block.name, block.input) for block in tool_blocks]
+            )
+        except Exception as e:
+            return [e] * len(tool_blocks)
+
+    async def _handle_tool_execution_async(
+        self,
+        initial_response,
+        base_params: Dict[str, Any],
+        tool_manager,
+    ):
+        """
+        Async counterpart of _handle_tool_execution.
+
+        Within a round each tool's calls run as one batch, and the tools run
+        concurrently in worker threads, so a round takes as long as its
+        slowest tool rather than their sum.
+
+        Args:
+            initial_response: The response containing tool use requests
+            base_params: API parameters of the initial call, reused each round
+            tool_manager: Manager to execute tools
+
+        Returns:
+            Final response text after tool execution
+        """
+        messages = base_params["messages"]
+        current_response = initial_response
+        rounds_completed = 0
+
+        while (
+            rounds_completed < self.MAX_TOOL_ROUNDS
+            and current_response.stop_reason == "tool_use"
+        ):
+            messages.append({"role": "assistant", "content": current_response.content})
+
+            # Each tool's calls run as one batch, and the tools run concurrently
+            tool_blocks = [
+                block for block in current_response.content if block.type == "tool_use"
+            ]
+            groups: Dict[str, List[int]] = {}
+            for i, block in enumerate(tool_blocks):
+                groups.setdefault(block.name, []).append(i)
+            group_results = await asyncio.gather(
+                *[
+                    asyncio.to_thread(
+                        self._run_tools,
+                        tool_manager,
+                        [tool_blocks[i] for i in indices],
+                    )
+                    for indices in groups.values()
+                ]
+            )
+            results: List[Any] = [None] * len(tool_blocks)
+            for indices, batch in zip(groups.values(), group_results, strict=True):
+                for i, result in zip(indices, batch, strict=True):
+                    results[i] = result
+            tool_results = [
+                self._tool_result(block, result)
+                for block, result in zip(tool_blocks, results, strict=True)
+            ]
+
+            if tool_results:
+                messages.append({"role": "user", "content": tool_results})
+
+            rounds_completed += 1
+
+            next_params = self._next_round_params(base_params, rounds_completed)
+            current_response = await self._create_message_async(**next_params)
+
+        return self._response_text(current_response)
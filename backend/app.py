@@ -5,10 +5,12 @@ warnings.filterwarnings("ignore", message="resource_tracker: There appear to be.
 import os
 from typing import List, Optional
 
+import orjson
 from config import config
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from rag_system import RAGSystem
@@ -75,8 +77,8 @@ async def query_documents(request: QueryRequest):
         if not session_id:
             session_id = rag_system.session_manager.create_session()
 
-        # Process query using RAG system
-        answer, sources = rag_system.query(request.query, session_id)
+        # Process query using RAG system without blocking the event loop
+        answer, sources = await rag_system.query_async(request.query, session_id)
 
         # Convert source dictionaries to Source objects
         source_objects = [Source(**source) for source in sources]
@@ -97,6 +99,28 @@ async def query_documents(request: QueryRequest):
         raise HTTPException(status_code=500, detail=error_msg)
 
 
+@app.post("/api/query/stream")
+async def query_documents_stream(request: QueryRequest):
+    """Process a query and stream the response as server-sent events"""
+    # Create session if not provided
+    session_id = request.session_id
+    if not session_id:
+        session_id = rag_system.session_manager.create_session()
+
+    def event_stream():
+        try:
+            for event in rag_system.query_stream(request.query, session_id):
+                if event["type"] == "done":
+                    event = {**event, "session_id": session_id}
+                yield b"data: " + orjson.dumps(event) + b"\n\n"
+        except Exception as e:
+            # Headers are already sent, so report failures as a stream event
+            error = {"type": "error", "detail": str(e)}
+            yield b"data: " + orjson.dumps(error) + b"\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.get("/api/courses", response_model=CourseStats)
 async def get_course_stats():
     """Get course analytics and statistics"""
@@ -23,6 +23,7 @@ class Config:
     CHUNK_OVERLAP: int = 100  # Characters to overlap between chunks
     MAX_RESULTS: int = 5  # Maximum search results to return
     MAX_HISTORY: int = 2  # Number of conversation messages to remember
+    MAX_QUERY_CHARS: int = 20000  # Longer queries are refused before the AI call
 
     # Database paths
     CHROMA_PATH: str = "./chroma_db"  # ChromaDB storage location
@@ -1,5 +1,6 @@
+import asyncio
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from ai_generator import AIGenerator
 from document_processor import DocumentProcessor
@@ -8,6 +9,8 @@ from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
 from session_manager import SessionManager
 from vector_store import VectorStore
 
+QUERY_TOO_LONG = "Query too long; please shorten it and try again."
+
 
 class RAGSystem:
     """Main orchestrator for the Retrieval-Augmented Generation system"""
@@ -134,13 +137,11 @@ class RAGSystem:
         Returns:
             Tuple of (response, sources list - empty for tool-based approach)
         """
-        # Create prompt for the AI with clear instructions
-        prompt = f"""Answer this question about course materials: {query}"""
+        # Refuse oversized input before paying for an AI call
+        if self._too_long(query):
+            return QUERY_TOO_LONG, []
 
-        # Get conversation history if session exists
-        history = None
-        if session_id:
-            history = self.session_manager.get_conversation_history(session_id)
+        prompt, history = self._prepare_query(query, session_id)
 
         # Generate response using AI with tools
         response = self.ai_generator.generate_response(
@@ -150,11 +151,151 @@ class RAGSystem:
             tool_manager=self.tool_manager,
         )
 
+        return self._finish_query(query, session_id, response)
+
+    async def query_async(
+        self, query: str, session_id: Optional[str] = None
+    ) -> Tuple[str, List[str]]:
+        """
+        Async variant of query that awaits the AI generator without blocking.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Returns:
+            Tuple of (response, sources list - empty for tool-based approach)
+        """
+        if self._too_long(query):
+            return QUERY_TOO_LONG, []
+
+        # Concurrent requests share the event loop, so each gets its own
+        # tool manager and cannot read or reset another request's sources
+        tool_manager = self._new_tool_manager()
+        prompt, history = self._prepare_query(query, session_id)
+
+        response = await self.ai_generator.generate_response_async(
+            query=prompt,
+            conversation_history=history,
+            tools=self.tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        return self._finish_query(query, session_id, response, tool_manager)
+
+    async def query_batch(
+        self, queries: List[str], session_ids: Optional[List[Optional[str]]] = None
+    ) -> List[Tuple[str, List[str]]]:
+        """
+        Answer several independent queries concurrently.
+
+        Each query gets its own tool manager so sources from one search never
+        leak into another answer. History is read before any query in the
+        batch finishes, so queries sharing a session do not see each other.
+
+        Args:
+            queries: User questions
+            session_ids: Optional session ID per query
+
+        Returns:
+            List of (response, sources) tuples aligned with queries
+        """
+        session_ids = session_ids or [None] * len(queries)
+        return list(
+            await asyncio.gather(
+                *(
+                    self.query_async(query, session_id)
+                    for query, session_id in zip(queries, session_ids, strict=True)
+                )
+            )
+        )
+
+    def query_stream(
+        self, query: str, session_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Process a user query, streaming the response as it is generated.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Yields:
+            {"type": "text", "text": ...} events for each response chunk,
+            then one {"type": "done", "sources": [...]} event
+        """
+        if self._too_long(query):
+            yield {"type": "text", "text": QUERY_TOO_LONG}
+            yield {"type": "done", "sources": []}
+            return
+
+        # The stream runs in a worker thread beside other requests, so it
+        # collects sources through a tool manager of its own
+        tool_manager = self._new_tool_manager()
+        prompt, history = self._prepare_query(query, session_id)
+
+        chunks = []
+        for chunk in self.ai_generator.generate_response_stream(
+            query=prompt,
+            conversation_history=history,
+            tools=self.tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        ):
+            chunks.append(chunk)
+            yield {"type": "text", "text": chunk}
+
+        _, sources = self._finish_query(
+            query, session_id, "".join(chunks), tool_manager
+        )
+        yield {"type": "done", "sources": sources}
+
+    def _new_tool_manager(self) -> ToolManager:
+        """
+        Private tool manager for one query, so its sources stay its own.
+
+        It registers the same tools as self.tool_manager, so callers pass the
+        shared manager's definitions instead of this one's. The AI generator
+        then sees one definitions object on every query and keeps reusing its
+        cache-marked copy.
+        """
+        tool_manager = ToolManager()
+        tool_manager.register_tool(CourseSearchTool(self.vector_store))
+        tool_manager.register_tool(CourseOutlineTool(self.vector_store))
+        return tool_manager
+
+    def _too_long(self, query: str) -> bool:
+        """Whether a query exceeds the configured character limit"""
+        return len(query) > self.config.MAX_QUERY_CHARS
+
+    def _prepare_query(
+        self, query: str, session_id: Optional[str]
+    ) -> Tuple[str, Optional[str]]:
+        """Build the AI prompt and fetch conversation history for a query"""
+        # Create prompt for the AI with clear instructions
+        prompt = f"""Answer this question about course materials: {query}"""
+
+        # Get conversation history if session exists
+        history = None
+        if session_id:
+            history = self.session_manager.get_conversation_history(session_id)
+
+        return prompt, history
+
+    def _finish_query(
+        self,
+        query: str,
+        session_id: Optional[str],
+        response: str,
+        tool_manager: Optional[ToolManager] = None,
+    ) -> Tuple[str, List[str]]:
+        """Collect tool sources and record the exchange in the session"""
+        tool_manager = tool_manager or self.tool_manager
+
         # Get sources from the search tool
-        sources = self.tool_manager.get_last_sources()
+        sources = tool_manager.get_last_sources()
 
         # Reset sources after retrieving them
-        self.tool_manager.reset_sources()
+        tool_manager.reset_sources()
 
         # Update conversation history
         if session_id:
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Protocol
+from typing import Any, Dict, List, Optional, Protocol, Tuple
 
 from vector_store import SearchResults, VectorStore
 
@@ -72,7 +72,48 @@ class CourseSearchTool(Tool):
         results = self.store.search(
             query=query, course_name=course_name, lesson_number=lesson_number
         )
+        return self._render(results, course_name, lesson_number)
 
+    def execute_batch(self, calls: List[Dict[str, Any]]) -> List[str]:
+        """
+        Execute several searches with one vector store round trip.
+
+        Calls without a query come back as error strings in their place, and
+        last_sources ends up holding the sources of every search in the batch.
+        """
+        results: List[str] = [""] * len(calls)
+        valid = []
+        for i, call in enumerate(calls):
+            if isinstance(call, dict) and "query" in call:
+                valid.append(i)
+            else:
+                results[i] = "Search call is missing its 'query'"
+        if not valid:
+            return results
+
+        all_results = self.store.batch_search(
+            queries=[calls[i]["query"] for i in valid],
+            course_names=[calls[i].get("course_name") for i in valid],
+            lesson_numbers=[calls[i].get("lesson_number") for i in valid],
+        )
+        sources = []
+        for i, found in zip(valid, all_results, strict=True):
+            # Each render replaces last_sources, so gather them as we go
+            self.last_sources = []
+            results[i] = self._render(
+                found, calls[i].get("course_name"), calls[i].get("lesson_number")
+            )
+            sources.extend(self.last_sources)
+        self.last_sources = sources
+        return results
+
+    def _render(
+        self,
+        results: SearchResults,
+        course_name: Optional[str],
+        lesson_number: Optional[int],
+    ) -> str:
+        """Turn search results into the tool's text output"""
         # Handle errors
         if results.error:
             return results.error
@@ -158,7 +199,7 @@ class CourseOutlineTool(Tool):
         Returns:
             Formatted course outline or error message
         """
-        import json
+        import orjson
 
         # Step 1: Resolve course name using semantic search
         resolved_title = self.store._resolve_course_name(course_name)
@@ -185,7 +226,7 @@ class CourseOutlineTool(Tool):
             if not lessons_json:
                 return f"No lessons found for course '{course_title}'"
 
-            lessons = json.loads(lessons_json)
+            lessons = orjson.loads(lessons_json)
 
             if not lessons:
                 return f"No lessons available for course '{course_title}'"
@@ -222,6 +263,8 @@ class ToolManager:
 
     def __init__(self):
         self.tools = {}
+        # Built once and reused for every query until another tool registers
+        self._tool_definitions: Optional[Tuple[Dict[str, Any], ...]] = None
 
     def register_tool(self, tool: Tool):
         """Register any tool that implements the Tool interface"""
@@ -230,10 +273,15 @@ class ToolManager:
         if not tool_name:
             raise ValueError("Tool must have a 'name' in its definition")
         self.tools[tool_name] = tool
+        self._tool_definitions = None
 
-    def get_tool_definitions(self) -> list:
+    def get_tool_definitions(self) -> Tuple[Dict[str, Any], ...]:
         """Get all tool definitions for Anthropic tool calling"""
-        return [tool.get_tool_definition() for tool in self.tools.values()]
+        if self._tool_definitions is None:
+            self._tool_definitions = tuple(
+                tool.get_tool_definition() for tool in self.tools.values()
+            )
+        return self._tool_definitions
 
     def execute_tool(self, tool_name: str, **kwargs) -> str:
         """Execute a tool by name with given parameters"""
@@ -242,6 +290,40 @@ class ToolManager:
 
         return self.tools[tool_name].execute(**kwargs)
 
+    def execute_tools_batch(self, calls: List[Tuple[str, Any]]) -> List[Any]:
+        """
+        Execute several tool calls, returning results in call order.
+
+        Calls are grouped by tool; tools with an execute_batch method get
+        their whole group at once, the rest run one call at a time. A call
+        that raises gets the exception as its result, so one bad call never
+        costs the others theirs.
+        """
+        results: List[Any] = [""] * len(calls)
+        groups: Dict[str, List[int]] = {}
+        for i, (tool_name, _) in enumerate(calls):
+            groups.setdefault(tool_name, []).append(i)
+
+        for tool_name, indices in groups.items():
+            tool = self.tools.get(tool_name)
+            if tool is None:
+                for i in indices:
+                    results[i] = f"Tool '{tool_name}' not found"
+            elif hasattr(tool, "execute_batch"):
+                try:
+                    batch = tool.execute_batch([calls[i][1] for i in indices])
+                except Exception as e:
+                    batch = [e] * len(indices)
+                for i, result in zip(indices, batch, strict=True):
+                    results[i] = result
+            else:
+                for i in indices:
+                    try:
+                        results[i] = tool.execute(**calls[i][1])
+                    except Exception as e:
+                        results[i] = e
+        return results
+
     def get_last_sources(self) -> list:
         """Get sources from the last search operation"""
         # Check all tools for last_sources attribute
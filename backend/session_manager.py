@@ -1,5 +1,7 @@
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from threading import RLock
+from typing import List, Optional
 
 
 @dataclass
@@ -13,43 +15,59 @@ class Message:
 class SessionManager:
     """Manages conversation sessions and message history"""
 
-    def __init__(self, max_history: int = 5):
+    def __init__(self, max_history: int = 5, max_sessions: int = 1000):
         self.max_history = max_history
-        self.sessions: Dict[str, List[Message]] = {}
+        self.max_sessions = max_sessions
+        # Least recently used first, so the oldest session is evicted in O(1)
+        self.sessions: OrderedDict[str, List[Message]] = OrderedDict()
         self.session_counter = 0
+        self._lock = RLock()
+
+    def _store(self, session_id: str, messages: List[Message]):
+        """Save a session as most recently used, evicting the oldest if full"""
+        self.sessions[session_id] = messages
+        self.sessions.move_to_end(session_id)
+        if len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
 
     def create_session(self) -> str:
         """Create a new conversation session"""
-        self.session_counter += 1
-        session_id = f"session_{self.session_counter}"
-        self.sessions[session_id] = []
+        with self._lock:
+            self.session_counter += 1
+            session_id = f"session_{self.session_counter}"
+            self._store(session_id, [])
         return session_id
 
     def add_message(self, session_id: str, role: str, content: str):
         """Add a message to the conversation history"""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = []
-
-        message = Message(role=role, content=content)
-        self.sessions[session_id].append(message)
+        with self._lock:
+            messages = self.sessions.get(session_id, [])
+            messages.append(Message(role=role, content=content))
 
-        # Keep conversation history within limits
-        if len(self.sessions[session_id]) > self.max_history * 2:
-            self.sessions[session_id] = self.sessions[session_id][
-                -self.max_history * 2 :
-            ]
+            # Keep conversation history within limits
+            if len(messages) > self.max_history * 2:
+                messages = messages[-self.max_history * 2 :]
+            self._store(session_id, messages)
 
     def add_exchange(self, session_id: str, user_message: str, assistant_message: str):
         """Add a complete question-answer exchange"""
-        self.add_message(session_id, "user", user_message)
-        self.add_message(session_id, "assistant", assistant_message)
+        with self._lock:
+            self.add_message(session_id, "user", user_message)
+            self.add_message(session_id, "assistant", assistant_message)
 
     def get_conversation_history(self, session_id: Optional[str]) -> Optional[str]:
         """Get formatted conversation history for a session"""
-        if not session_id or session_id not in self.sessions:
+        if not session_id:
             return None
 
-        messages = self.sessions[session_id]
+        with self._lock:
+            messages = self.sessions.get(session_id)
+            if messages is None:
+                return None
+            self.sessions.move_to_end(session_id)
+            # Copy so formatting runs outside the lock on a stable list
+            messages = list(messages)
+
         if not messages:
             return None
 
@@ -62,5 +80,6 @@ class SessionManager:
 
     def clear_session(self, session_id: str):
         """Clear all messages from a session"""
-        if session_id in self.sessions:
-            self.sessions[session_id] = []
+        with self._lock:
+            if session_id in self.sessions:
+                self.sessions[session_id] = []
@@ -1,27 +1,39 @@
 """Shared test fixtures and configuration for pytest"""
 
 import os
-import sys
+from collections import deque
+from collections.abc import Iterator
+from dataclasses import dataclass, field
 from pathlib import Path
-from unittest.mock import MagicMock, Mock, patch
+from types import MappingProxyType
+from unittest.mock import AsyncMock, Mock, patch
 
+import orjson
 import pytest
-
-# Add backend directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-from ai_generator import AIGenerator
+import pytest_asyncio
 from config import Config
 from models import Course, CourseChunk, Lesson
-from rag_system import RAGSystem
-from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
-from session_manager import SessionManager
-from vector_store import SearchResults, VectorStore
+
+# Backend modules that pull in chromadb, sentence-transformers or anthropic
+# are imported inside the fixtures that need them, keeping collection fast
 
 # ============ Fixture Data ============
 
+# Immutable sample data is built once per run; tests must not mutate it
 
-@pytest.fixture
+# Serialized lesson metadata as stored in the course catalog
+SAMPLE_LESSONS_JSON = orjson.dumps(
+    [
+        {
+            "lesson_number": 0,
+            "lesson_title": "Introduction to ML",
+            "lesson_link": "https://example.com/ml-course/lesson-0",
+        }
+    ]
+).decode()
+
+
+@pytest.fixture(scope="session")
 def sample_course():
     """Sample course object for testing"""
     return Course(
@@ -48,7 +60,7 @@ def sample_course():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_chunks(sample_course):
     """Sample course chunks for testing"""
     return [
@@ -73,9 +85,11 @@ def sample_chunks(sample_course):
     ]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_search_results():
     """Sample search results from vector store"""
+    from vector_store import SearchResults
+
     return SearchResults(
         documents=[
             "Machine learning is a subset of artificial intelligence.",
@@ -92,67 +106,320 @@ def sample_search_results():
 # ============ Mock Components ============
 
 
+class _StubVectorStore:
+    """Plain stand-in for VectorStore exposing only what the tools touch
+
+    Each method is a Mock set up once here, so tests avoid the spec
+    introspection and attribute synthesis of Mock(spec=VectorStore).
+    """
+
+    def __init__(self, search_results):
+        self._search_results = search_results
+        self.search = Mock()
+        self.batch_search = Mock()
+        self._resolve_course_name = Mock()
+        self.get_lesson_link = Mock()
+        self.course_catalog = Mock()
+        self._configure()
+
+    def _configure(self):
+        """Install the default return values"""
+        self.search.return_value = self._search_results
+        self.batch_search.side_effect = lambda queries, **kwargs: [
+            self._search_results
+        ] * len(queries)
+        self._resolve_course_name.return_value = "Introduction to Machine Learning"
+        self.get_lesson_link.return_value = "https://example.com/ml-course/lesson-0"
+        self.course_catalog.get.return_value = {
+            "metadatas": [
+                {
+                    "title": "Introduction to Machine Learning",
+                    "course_link": "https://example.com/ml-course",
+                    "instructor": "Dr. Jane Smith",
+                    "lessons_json": SAMPLE_LESSONS_JSON,
+                    "lesson_count": 3,
+                }
+            ]
+        }
+
+    def reset(self):
+        """Forget calls and per-test configuration, restoring the defaults"""
+        for method in (
+            self.search,
+            self.batch_search,
+            self._resolve_course_name,
+            self.get_lesson_link,
+            self.course_catalog,
+        ):
+            method.reset_mock(return_value=True, side_effect=True)
+        self._configure()
+
+
+@pytest.fixture(scope="module")
+def _tool_stack(sample_search_results):
+    """Store, tools and manager built once per module; only state is reset"""
+    from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
+
+    store = _StubVectorStore(sample_search_results)
+    search_tool = CourseSearchTool(store)
+    outline_tool = CourseOutlineTool(store)
+    manager = ToolManager()
+    manager.register_tool(search_tool)
+    manager.register_tool(outline_tool)
+    return store, search_tool, outline_tool, manager
+
+
 @pytest.fixture
-def mock_vector_store(sample_search_results):
-    """Mock VectorStore with pre-configured responses"""
-    mock_store = Mock(spec=VectorStore)
-    mock_store.search.return_value = sample_search_results
-    mock_store._resolve_course_name.return_value = "Introduction to Machine Learning"
-    mock_store.get_lesson_link.return_value = "https://example.com/ml-course/lesson-0"
-
-    # Mock course catalog get method
-    mock_store.course_catalog = Mock()
-    mock_store.course_catalog.get.return_value = {
-        "metadatas": [
+def mock_vector_store(_tool_stack):
+    """Stub VectorStore with pre-configured responses, reset for each test"""
+    store, _, _, manager = _tool_stack
+    store.reset()
+    manager.reset_sources()
+    return store
+
+
+@dataclass(slots=True)
+class _FakeBlock:
+    """Lightweight stand-in for an Anthropic content block"""
+
+    type: str = "text"
+    text: str = ""
+    name: str = ""
+    id: str = ""
+    input: dict = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class _FakeResponse:
+    """Lightweight stand-in for an Anthropic message response"""
+
+    content: list
+    stop_reason: str
+
+
+class _FastCreate:
+    """Cheap stand-in for messages.create that records calls without Mock
+
+    Each call's keyword arguments are appended to ``calls``. The Mock surface
+    is mirrored for compatibility: side_effect (response list or iterator,
+    exception or callable), return_value, call_count, call_args(_list) and the
+    assert_not_called/assert_called_once helpers.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.return_value = None
+        self._responses = deque()
+        self._side_effect = None
+
+    def set_responses(self, responses):
+        """Queue responses to be returned one per call"""
+        self._responses = deque(responses)
+
+    def reset(self):
+        """Forget recorded calls and configured responses"""
+        self.calls.clear()
+        self.return_value = None
+        self._responses.clear()
+        self._side_effect = None
+
+    @property
+    def side_effect(self):
+        return self._side_effect
+
+    @side_effect.setter
+    def side_effect(self, value):
+        if isinstance(value, (list, tuple, Iterator)):
+            self.set_responses(value)
+            value = None
+        else:
+            self._responses.clear()
+        self._side_effect = value
+
+    @property
+    def call_count(self):
+        return len(self.calls)
+
+    @property
+    def call_args_list(self):
+        return [((), kwargs) for kwargs in self.calls]
+
+    @property
+    def call_args(self):
+        return ((), self.calls[-1]) if self.calls else None
+
+    def __call__(self, **kwargs):
+        self.calls.append(kwargs)
+        effect = self._side_effect
+        if effect is not None:
+            if isinstance(effect, BaseException) or (
+                isinstance(effect, type) and issubclass(effect, BaseException)
+            ):
+                raise effect
+            return effect(**kwargs)
+        if self._responses:
+            return self._responses.popleft()
+        return self.return_value
+
+    def assert_not_called(self):
+        assert self.call_count == 0, f"Expected no calls, got {self.call_count}"
+
+    def assert_called_once(self):
+        assert self.call_count == 1, f"Expected one call, got {self.call_count}"
+
+
+class _QueuedMessages:
+    """httpx handler answering Messages API calls from queued JSON bodies
+
+    Lets the real SDK serialize requests and parse responses with no network.
+    """
+
+    def __init__(self):
+        self.responses = deque()
+        self.requests = []
+
+    def queue_text(self, text):
+        self._queue([{"type": "text", "text": text}], "end_turn")
+
+    def queue_tool_use(self, name, id, input):
+        self._queue(
+            [{"type": "tool_use", "id": id, "name": name, "input": input}],
+            "tool_use",
+        )
+
+    def _queue(self, content, stop_reason):
+        self.responses.append(
             {
-                "title": "Introduction to Machine Learning",
-                "course_link": "https://example.com/ml-course",
-                "instructor": "Dr. Jane Smith",
-                "lessons_json": '[{"lesson_number": 0, "lesson_title": "Introduction to ML", "lesson_link": "https://example.com/ml-course/lesson-0"}]',
-                "lesson_count": 3,
+                "id": f"msg_{len(self.responses)}",
+                "type": "message",
+                "role": "assistant",
+                "model": "claude-sonnet-4-20250514",
+                "content": content,
+                "stop_reason": stop_reason,
+                "stop_sequence": None,
+                "usage": {"input_tokens": 10, "output_tokens": 10},
             }
-        ]
-    }
+        )
 
-    return mock_store
+    def __call__(self, request):
+        import httpx
 
+        self.requests.append(orjson.loads(request.content))
+        return httpx.Response(200, json=self.responses.popleft())
 
-@pytest.fixture
-def mock_anthropic_client():
-    """Mock Anthropic API client"""
-    mock_client = Mock()
 
-    # Create mock response for direct queries (no tools)
-    mock_direct_response = Mock()
-    mock_direct_response.content = [Mock(text="This is a direct answer")]
-    mock_direct_response.stop_reason = "end_turn"
-
-    # Create mock response for tool use
-    mock_tool_response = Mock()
-    mock_tool_block = Mock()
-    mock_tool_block.type = "tool_use"
-    mock_tool_block.name = "search_course_content"
-    mock_tool_block.id = "tool_123"
-    mock_tool_block.input = {"query": "machine learning"}
-    mock_tool_response.content = [mock_tool_block]
-    mock_tool_response.stop_reason = "tool_use"
-
-    # Create mock final response after tool use
-    mock_final_response = Mock()
-    mock_final_response.content = [
-        Mock(text="Based on the course materials, machine learning is...")
+@pytest.fixture(scope="module")
+def mock_response_factory():
+    """Factory for canned Anthropic responses"""
+
+    def make(text=None, tool_use=None, stop_reason=None):
+        if tool_use:
+            return _FakeResponse(
+                content=list(tool_use), stop_reason=stop_reason or "tool_use"
+            )
+        return _FakeResponse(
+            content=[_FakeBlock(text=text)], stop_reason=stop_reason or "end_turn"
+        )
+
+    return make
+
+
+@pytest.fixture(scope="module")
+def tool_block_factory():
+    """Factory for tool_use content blocks"""
+
+    def make_tool_block(name, id, input):
+        return _FakeBlock(type="tool_use", name=name, id=id, input=input)
+
+    return make_tool_block
+
+
+@pytest.fixture
+def sequential_three_round_mocks(mock_response_factory, tool_block_factory):
+    """Two tool_use responses followed by a final text answer"""
+    tool_blocks = [
+        tool_block_factory(
+            "get_course_outline", "tool_001", {"course_name": "Machine Learning"}
+        ),
+        tool_block_factory(
+            "search_course_content", "tool_002", {"query": "supervised learning"}
+        ),
     ]
-    mock_final_response.stop_reason = "end_turn"
+    responses = [
+        mock_response_factory(tool_use=[tool_blocks[0]]),
+        mock_response_factory(tool_use=[tool_blocks[1]]),
+        mock_response_factory(text="Final answer after two tool calls"),
+    ]
+    return responses, tool_blocks
+
+
+@pytest.fixture(scope="module")
+def _anthropic_client_mocks():
+    """Mock Anthropic client and its default responses, built once per module"""
+    # Narrow spec_set mocks: cheaper than MagicMock and typos raise
+    mock_client = Mock(spec_set=["messages", "beta"])
+    mock_client.messages = Mock(spec_set=["create", "stream", "batches"])
+    mock_client.beta = Mock(spec_set=["messages"])
+    mock_client.beta.messages = Mock(spec_set=["create", "stream"])
+
+    # Response for tool use
+    mock_tool_response = _FakeResponse(
+        content=[
+            _FakeBlock(
+                type="tool_use",
+                name="search_course_content",
+                id="tool_123",
+                input={"query": "machine learning"},
+            )
+        ],
+        stop_reason="tool_use",
+    )
+
+    # Final response after tool use
+    mock_final_response = _FakeResponse(
+        content=[
+            _FakeBlock(text="Based on the course materials, machine learning is...")
+        ],
+        stop_reason="end_turn",
+    )
+
+    mock_client.messages.create = _FastCreate()
+
+    return mock_client, (mock_tool_response, mock_final_response)
+
+
+@pytest.fixture
+def mock_anthropic_client(_anthropic_client_mocks):
+    """Mock Anthropic API client, reset and re-primed for each test"""
+    mock_client, default_responses = _anthropic_client_mocks
+    mock_client.reset_mock(return_value=True, side_effect=True)
 
     # Configure mock to return different responses
-    mock_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
+    mock_client.messages.create.reset()
+    mock_client.messages.create.set_responses(default_responses)
 
     return mock_client
 
 
 @pytest.fixture
-def test_config():
+def messages_transport():
+    """Queue of Messages API responses served over an in-memory transport"""
+    return _QueuedMessages()
+
+
+@pytest.fixture
+def mock_async_anthropic_client():
+    """Mock AsyncAnthropic API client"""
+    mock_client = Mock()
+    mock_client.messages.create = AsyncMock()
+    return mock_client
+
+
+@pytest.fixture(scope="session")
+def test_config(tmp_path_factory):
     """Test configuration with safe defaults"""
+    # Under xdist each worker gets its own base temp dir, so nothing that
+    # does open this path can collide with another worker or the repo
     return Config(
         ANTHROPIC_API_KEY="test_key_123",
         ANTHROPIC_MODEL="claude-sonnet-4-20250514",
@@ -161,7 +428,7 @@ def test_config():
         CHUNK_OVERLAP=100,
         MAX_RESULTS=5,
         MAX_HISTORY=2,
-        CHROMA_PATH="./test_chroma_db",
+        CHROMA_PATH=str(tmp_path_factory.mktemp("chroma")),
     )
 
 
@@ -169,37 +436,130 @@ def test_config():
 
 
 @pytest.fixture
-def course_search_tool(mock_vector_store):
+def course_search_tool(_tool_stack, mock_vector_store):
     """CourseSearchTool instance with mocked vector store"""
-    return CourseSearchTool(mock_vector_store)
+    return _tool_stack[1]
 
 
 @pytest.fixture
-def course_outline_tool(mock_vector_store):
+def course_outline_tool(_tool_stack, mock_vector_store):
     """CourseOutlineTool instance with mocked vector store"""
-    return CourseOutlineTool(mock_vector_store)
+    return _tool_stack[2]
 
 
 @pytest.fixture
-def tool_manager(course_search_tool, course_outline_tool):
-    """ToolManager with registered tools"""
+def tool_manager(_tool_stack, mock_vector_store):
+    """ToolManager with registered tools; sources are cleared per test"""
+    return _tool_stack[3]
+
+
+@pytest.fixture
+def failing_tool_manager(tool_manager, monkeypatch):
+    """ToolManager whose tool execution always raises"""
+    # monkeypatch restores the shared manager after the test
+    for method in ("execute_tool", "execute_tools_batch"):
+        monkeypatch.setattr(
+            tool_manager, method, Mock(side_effect=Exception("Tool failed"))
+        )
+    return tool_manager
+
+
+@pytest.fixture(scope="session")
+def tool_definitions():
+    """Tool definitions shared by the run; they never touch the store"""
+    from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
+
     manager = ToolManager()
-    manager.register_tool(course_search_tool)
-    manager.register_tool(course_outline_tool)
-    return manager
+    manager.register_tool(CourseSearchTool(Mock()))
+    manager.register_tool(CourseOutlineTool(Mock()))
+    return manager.get_tool_definitions()
+
+
+def _freeze(value):
+    """Read-only deep copy of nested dicts and lists"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+@pytest.fixture(scope="session")
+def frozen_tool_defs(tool_definitions):
+    """Read-only tool definitions; any mutation by the code under test raises"""
+    return tuple(_freeze(definition) for definition in tool_definitions)
+
+
+def _refuse_live_request(request):
+    """Transport handler failing any request a test forgot to mock"""
+    raise RuntimeError(f"Unmocked Anthropic request: {request.method} {request.url}")
+
+
+@pytest.fixture(scope="session")
+def _ai_generator_base(test_config):
+    """One AIGenerator for the run; tests monkeypatch in their own clients"""
+    import anthropic
+    import httpx
+    from ai_generator import AIGenerator
+
+    # Prompt, base params and tool-choice constants are read-only, so the
+    # clients are the only per-test state
+    generator = AIGenerator(test_config.ANTHROPIC_API_KEY, test_config.ANTHROPIC_MODEL)
+
+    # Until a test swaps a client in, nothing may reach the real API
+    generator.client = anthropic.Anthropic(
+        api_key=test_config.ANTHROPIC_API_KEY,
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(_refuse_live_request)),
+    )
+    generator.async_client = anthropic.AsyncAnthropic(
+        api_key=test_config.ANTHROPIC_API_KEY,
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            transport=httpx.MockTransport(_refuse_live_request)
+        ),
+    )
+    return generator
 
 
 @pytest.fixture
-def ai_generator_with_mock(mock_anthropic_client, test_config):
+def ai_generator_with_mock(_ai_generator_base, mock_anthropic_client, monkeypatch):
     """AIGenerator with mocked Anthropic client"""
+    # monkeypatch puts the refusing client back after the test
+    monkeypatch.setattr(_ai_generator_base, "client", mock_anthropic_client)
+    return _ai_generator_base
+
+
+@pytest.fixture
+def ai_generator_with_transport(messages_transport, test_config):
+    """AIGenerator whose real Anthropic client talks to messages_transport"""
+    import anthropic
+    import httpx
+    from ai_generator import AIGenerator
+
     generator = AIGenerator(test_config.ANTHROPIC_API_KEY, test_config.ANTHROPIC_MODEL)
-    generator.client = mock_anthropic_client
+    generator.client = anthropic.Anthropic(
+        api_key=test_config.ANTHROPIC_API_KEY,
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(messages_transport)),
+    )
     return generator
 
 
+@pytest.fixture
+def ai_generator_with_async_mock(
+    _ai_generator_base, mock_async_anthropic_client, monkeypatch
+):
+    """AIGenerator with mocked AsyncAnthropic client"""
+    monkeypatch.setattr(_ai_generator_base, "async_client", mock_async_anthropic_client)
+    return _ai_generator_base
+
+
 @pytest.fixture
 def session_manager():
     """SessionManager instance"""
+    from session_manager import SessionManager
+
     return SessionManager(max_history=2)
 
 
@@ -215,26 +575,25 @@ def sample_course_file():
 # ============ Cleanup Fixtures ============
 
 
-@pytest.fixture(autouse=True)
-def cleanup_test_db():
-    """Clean up test database after each test"""
-    yield
-    test_db_path = Path("./test_chroma_db")
-    if test_db_path.exists():
-        import shutil
-
-        shutil.rmtree(test_db_path, ignore_errors=True)
+@pytest.fixture
+def chroma_db_sandbox(tmp_path):
+    """Per-test ChromaDB directory for tests that touch disk; pytest removes it"""
+    return tmp_path / "chroma"
 
 
 # ============ API Testing Fixtures ============
 
-@pytest.fixture
-def test_app():
-    """Create a test FastAPI app without static file mounting"""
+
+@pytest.fixture(scope="session")
+def api_app():
+    """Build the test FastAPI app once, without static file mounting"""
+    from typing import List, Optional
+
     from fastapi import FastAPI, HTTPException
     from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import StreamingResponse
     from pydantic import BaseModel
-    from typing import List, Optional
+    from rag_system import RAGSystem
 
     # Create fresh app instance
     app = FastAPI(title="Course Materials RAG System - Test")
@@ -251,28 +610,29 @@ def test_app():
     # Pydantic models for request/response
     class QueryRequest(BaseModel):
         """Request model for course queries"""
+
         query: str
         session_id: Optional[str] = None
 
     class Source(BaseModel):
         """Model for a source citation with optional link"""
+
         text: str
         link: Optional[str] = None
 
     class QueryResponse(BaseModel):
         """Response model for course queries"""
+
         answer: str
         sources: List[Source]
         session_id: str
 
     class CourseStats(BaseModel):
         """Response model for course statistics"""
+
         total_courses: int
         course_titles: List[str]
 
-    # Create mock RAG system for testing
-    mock_rag = Mock(spec=RAGSystem)
-
     @app.post("/api/query", response_model=QueryResponse)
     async def query_documents(request: QueryRequest):
         """Process a query and return response with sources"""
@@ -281,44 +641,105 @@ def test_app():
             session_id = request.session_id or "test_session_1"
 
             # Process query using mocked RAG system
-            answer, sources = mock_rag.query(request.query, session_id)
+            answer, sources = await app.state.mock_rag.query_async(
+                request.query, session_id
+            )
 
             # Convert source dictionaries to Source objects
             source_objects = [Source(**source) for source in sources]
 
             return QueryResponse(
-                answer=answer,
-                sources=source_objects,
-                session_id=session_id
+                answer=answer, sources=source_objects, session_id=session_id
             )
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
+    @app.post("/api/query/stream")
+    async def query_documents_stream(request: QueryRequest):
+        """Process a query and stream the response as server-sent events"""
+        session_id = request.session_id or "test_session_1"
+
+        def event_stream():
+            try:
+                for event in app.state.mock_rag.query_stream(request.query, session_id):
+                    if event["type"] == "done":
+                        event = {**event, "session_id": session_id}
+                    yield b"data: " + orjson.dumps(event) + b"\n\n"
+            except Exception as e:
+                error = {"type": "error", "detail": str(e)}
+                yield b"data: " + orjson.dumps(error) + b"\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
     @app.get("/api/courses", response_model=CourseStats)
     async def get_course_stats():
         """Get course analytics and statistics"""
         try:
-            analytics = mock_rag.get_course_analytics()
+            analytics = app.state.mock_rag.get_course_analytics()
             return CourseStats(
                 total_courses=analytics["total_courses"],
-                course_titles=analytics["course_titles"]
+                course_titles=analytics["course_titles"],
             )
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    # Store mock for access in tests
-    app.state.mock_rag = mock_rag
+    # Endpoints look up the mock per request so tests can swap it out
+    app.state.mock_rag = Mock(spec=RAGSystem)
 
     return app
 
 
 @pytest.fixture
-async def test_client(test_app):
-    """Create async test client for API testing"""
-    from httpx import AsyncClient, ASGITransport
+def test_app(api_app):
+    """Shared test app with its mock RAG system reset for each test"""
+    # Tests only configure return values and side effects, so resetting the
+    # one spec'd mock is enough and avoids re-introspecting RAGSystem
+    api_app.state.mock_rag.reset_mock(return_value=True, side_effect=True)
+    return api_app
+
+
+class _RagReturns:
+    """One-line setters for what the API test app's mock RAG system returns"""
+
+    def __init__(self, mock_rag):
+        self.mock_rag = mock_rag
+
+    def query(self, answer, sources=()):
+        """Make query_async return answer with the given source dicts"""
+        self.mock_rag.query_async.return_value = (answer, sources)
+
+    def analytics(self, course_titles):
+        """Make get_course_analytics report the given course titles"""
+        self.mock_rag.get_course_analytics.return_value = {
+            "total_courses": len(course_titles),
+            "course_titles": course_titles,
+        }
+
+
+@pytest.fixture
+def rag_returns(test_app):
+    """Setters for the mock RAG results, bound to the freshly reset test app"""
+    return _RagReturns(test_app.state.mock_rag)
+
+
+@pytest.fixture
+def direct_query(test_app):
+    """Call the /api/query handler directly, skipping ASGI, JSON and routing"""
+    route = next(r for r in test_app.routes if getattr(r, "path", None) == "/api/query")
+    request_model = route.body_field.type_
+
+    async def call(query, session_id=None):
+        return await route.endpoint(request_model(query=query, session_id=session_id))
+
+    return call
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def test_client(api_app):
+    """Async test client for API testing, reused across the session"""
+    from httpx import ASGITransport, AsyncClient
 
     async with AsyncClient(
-        transport=ASGITransport(app=test_app),
-        base_url="http://test"
+        transport=ASGITransport(app=api_app), base_url="http://test"
     ) as client:
         yield client
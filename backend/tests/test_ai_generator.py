@@ -1,10 +1,53 @@
 """Unit tests for AIGenerator"""
 
-from unittest.mock import MagicMock, Mock, call, patch
+from collections import namedtuple
+from types import SimpleNamespace
+from unittest.mock import Mock, call, patch
 
 import pytest
 from ai_generator import AIGenerator
 
+# Plain content blocks; tests only read their attributes
+TextBlock = namedtuple("TextBlock", ["text"])
+ToolUseBlock = namedtuple("ToolUseBlock", ["type", "name", "id", "input"])
+
+# Phrase identifying the course-materials system prompt
+EXPECTED_SYSTEM_SENTINEL = "AI assistant specialized in course materials"
+
+# Single-shot success response; tests only read it, so one instance is shared
+_CANNED_OK = SimpleNamespace(content=[TextBlock("Answer")], stop_reason="end_turn")
+
+
+def tool_use_response(name, id_, input_):
+    """Response requesting a single tool call"""
+    return SimpleNamespace(
+        content=[ToolUseBlock("tool_use", name, id_, input_)], stop_reason="tool_use"
+    )
+
+
+def final_text_response(text):
+    """Response ending the turn with a text answer"""
+    return SimpleNamespace(content=[TextBlock(text)], stop_reason="end_turn")
+
+
+def nth_call_kwargs(client, n):
+    """Keyword arguments of a Mock client's nth messages.create call"""
+    return client.messages.create.call_args_list[n].kwargs
+
+
+def queue_responses(client, *responses):
+    """Queue responses for the client's successive messages.create calls"""
+    client.messages.create.side_effect = iter(responses)
+
+
+def _assert_standard_params(kwargs, expected_model=None):
+    """Check the fixed parameters every initial API call carries"""
+    assert kwargs["temperature"] == 0
+    assert kwargs["max_tokens"] == 800
+    assert kwargs["system"] == AIGenerator.SYSTEM_BLOCKS
+    if expected_model is not None:
+        assert kwargs["model"] == expected_model
+
 
 class TestAIGeneratorBasic:
     """Tests for basic AIGenerator functionality"""
@@ -14,11 +57,7 @@ class TestAIGeneratorBasic:
     ):
         """Test generating response without tools"""
         # Configure mock for direct response
-        mock_direct_response = Mock()
-        mock_content = Mock()
-        mock_content.text = "Direct answer"
-        mock_direct_response.content = [mock_content]
-        mock_direct_response.stop_reason = "end_turn"
+        mock_direct_response = final_text_response("Direct answer")
         # Reset side_effect and set return_value
         mock_anthropic_client.messages.create.side_effect = None
         mock_anthropic_client.messages.create.return_value = mock_direct_response
@@ -35,7 +74,7 @@ class TestAIGeneratorBasic:
         assert mock_anthropic_client.messages.create.call_count == 1
 
         # Verify API call parameters
-        call_args = mock_anthropic_client.messages.create.call_args[1]
+        call_args = mock_anthropic_client.messages.create.calls[-1]
         assert "messages" in call_args
         assert call_args["messages"][0]["role"] == "user"
         assert "What is machine learning?" in call_args["messages"][0]["content"]
@@ -45,28 +84,24 @@ class TestAIGeneratorBasic:
     ):
         """Test that system prompt is included in API call"""
         # Configure mock
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Answer")]
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        mock_anthropic_client.messages.create.return_value = _CANNED_OK
 
         # Generate response
         ai_generator_with_mock.generate_response(query="Test query")
 
-        # Verify system prompt was included
-        call_args = mock_anthropic_client.messages.create.call_args[1]
+        # Verify system prompt was included as a cacheable block
+        call_args = mock_anthropic_client.messages.create.calls[-1]
         assert "system" in call_args
-        assert "AI assistant specialized in course materials" in call_args["system"]
+        system_block = call_args["system"][0]
+        assert EXPECTED_SYSTEM_SENTINEL in system_block["text"]
+        assert system_block["cache_control"] == {"type": "ephemeral"}
 
     def test_conversation_history_integration(
         self, ai_generator_with_mock, mock_anthropic_client
     ):
-        """Test conversation history is included in system context"""
+        """Test conversation history is sent in the user turn, not the system"""
         # Configure mock
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Answer")]
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        mock_anthropic_client.messages.create.return_value = _CANNED_OK
 
         # Generate response with history
         history = "User: Previous question\nAssistant: Previous answer"
@@ -74,149 +109,166 @@ class TestAIGeneratorBasic:
             query="Follow-up question", conversation_history=history
         )
 
-        # Verify history was included in system prompt
-        call_args = mock_anthropic_client.messages.create.call_args[1]
-        assert "Previous conversation:" in call_args["system"]
-        assert history in call_args["system"]
+        # System prompt stays a single cached block
+        call_args = mock_anthropic_client.messages.create.calls[-1]
+        assert call_args["system"] == AIGenerator.SYSTEM_BLOCKS
+
+        # History leads the user turn, followed by the actual query
+        history_block, query_block = call_args["messages"][0]["content"]
+        assert "<conversation_history>" in history_block["text"]
+        assert history in history_block["text"]
+        assert query_block["text"] == "Follow-up question"
+
+    def test_system_identical_across_histories(
+        self, ai_generator_with_mock, mock_anthropic_client
+    ):
+        """Test that the system prompt does not vary with conversation history"""
+        mock_anthropic_client.messages.create.side_effect = None
+        mock_anthropic_client.messages.create.return_value = _CANNED_OK
+
+        ai_generator_with_mock.generate_response(query="First")
+        ai_generator_with_mock.generate_response(
+            query="Second", conversation_history="User: First\nAssistant: Answer"
+        )
+
+        first_call, second_call = mock_anthropic_client.messages.create.calls
+        assert first_call["system"] is second_call["system"]
 
 
 class TestAIGeneratorToolCalling:
     """Tests for tool calling functionality"""
 
-    def test_generate_triggers_tool(
-        self, ai_generator_with_mock, mock_anthropic_client, tool_manager
+    @pytest.mark.parametrize(
+        "tool_name,tool_id,tool_input",
+        [
+            ("search_course_content", "tool_123", {"query": "machine learning"}),
+            ("get_course_outline", "tool_xyz", {"course_name": "ML"}),
+        ],
+        ids=["search", "outline"],
+    )
+    def test_tool_call_loop_contract(
+        self,
+        ai_generator_with_mock,
+        mock_anthropic_client,
+        tool_manager,
+        frozen_tool_defs,
+        tool_name,
+        tool_id,
+        tool_input,
     ):
-        """Test that tool use is triggered correctly"""
-        # Configure mock for tool use
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_123"
-        mock_tool_block.input = {"query": "machine learning"}
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Final answer")]
-        mock_final_response.stop_reason = "end_turn"
-
-        mock_anthropic_client.messages.create.side_effect = [
-            mock_tool_response,
-            mock_final_response,
-        ]
+        """Test one tool round: execution, result message and final answer"""
+        queue_responses(
+            mock_anthropic_client,
+            tool_use_response(tool_name, tool_id, tool_input),
+            final_text_response("Final answer"),
+        )
 
-        # Generate response with tools
-        tools = tool_manager.get_tool_definitions()
         response = ai_generator_with_mock.generate_response(
             query="What is machine learning in the course?",
-            tools=tools,
+            tools=frozen_tool_defs,
             tool_manager=tool_manager,
         )
 
-        # Should return final response after tool execution
+        # Final response is returned after one initial and one follow-up call
         assert response == "Final answer"
-
-        # Should have called API twice (initial + final)
         assert mock_anthropic_client.messages.create.call_count == 2
 
+        # Second call carries user + assistant + tool_result messages
+        messages = mock_anthropic_client.messages.create.calls[1]["messages"]
+        assert len(messages) == 3
+        tool_result_msg = messages[2]
+        assert tool_result_msg["role"] == "user"
+        assert isinstance(tool_result_msg["content"], list)
+        tool_result = tool_result_msg["content"][0]
+        assert tool_result["type"] == "tool_result"
+        assert tool_result["tool_use_id"] == tool_id
+        assert "content" in tool_result
+
+    def test_round_searches_share_one_store_call(
+        self,
+        ai_generator_with_mock,
+        mock_anthropic_client,
+        tool_manager,
+        mock_vector_store,
+        frozen_tool_defs,
+    ):
+        """Test that a round's searches reach the vector store as one batch"""
+        search_blocks = [
+            ToolUseBlock("tool_use", "search_course_content", f"tool_{n}", input_)
+            for n, input_ in enumerate(
+                [{"query": "supervised"}, {"query": "unsupervised"}, {}]
+            )
+        ]
+        queue_responses(
+            mock_anthropic_client,
+            SimpleNamespace(content=search_blocks, stop_reason="tool_use"),
+            final_text_response("Final answer"),
+        )
+
+        ai_generator_with_mock.generate_response(
+            query="Compare them",
+            tools=frozen_tool_defs,
+            tool_manager=tool_manager,
+        )
+
+        mock_vector_store.search.assert_not_called()
+        mock_vector_store.batch_search.assert_called_once()
+        kwargs = mock_vector_store.batch_search.call_args.kwargs
+        assert kwargs["queries"] == ["supervised", "unsupervised"]
+
+        # Results keep block order; the call without a query gets an error
+        messages = mock_anthropic_client.messages.create.calls[1]["messages"]
+        tool_results = messages[2]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == [
+            "tool_0",
+            "tool_1",
+            "tool_2",
+        ]
+        assert "Machine learning is a subset" in tool_results[1]["content"]
+        assert "missing its 'query'" in tool_results[2]["content"]
+
     def test_tool_choice_auto(self, ai_generator_with_mock, mock_anthropic_client):
         """Test that tool_choice is set to auto when tools provided"""
         # Configure mock
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Answer")]
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        mock_anthropic_client.messages.create.return_value = _CANNED_OK
 
         # Generate with tools
         tools = [{"name": "test_tool", "description": "Test"}]
         ai_generator_with_mock.generate_response(query="Test", tools=tools)
 
         # Verify tool_choice was set
-        call_args = mock_anthropic_client.messages.create.call_args[1]
+        call_args = mock_anthropic_client.messages.create.calls[-1]
         assert "tool_choice" in call_args
         assert call_args["tool_choice"]["type"] == "auto"
 
-    def test_tool_execution_loop(
-        self, ai_generator_with_mock, mock_anthropic_client, tool_manager
-    ):
-        """Test complete tool execution loop"""
-        # Configure mock for tool use
-        mock_tool_response = Mock()
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = "tool_abc"
-        tool_block.input = {"query": "supervised learning"}
-        mock_tool_response.content = [tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-
-        mock_final = Mock()
-        mock_final.content = [Mock(text="Based on the search...")]
-        mock_final.stop_reason = "end_turn"
-
-        mock_anthropic_client.messages.create.side_effect = [
-            mock_tool_response,
-            mock_final,
-        ]
-
-        # Execute
-        response = ai_generator_with_mock.generate_response(
-            query="Tell me about supervised learning",
-            tools=tool_manager.get_tool_definitions(),
-            tool_manager=tool_manager,
-        )
-
-        # Verify complete loop executed
-        assert mock_anthropic_client.messages.create.call_count == 2
-
-        # Verify second call included tool results
-        second_call_args = mock_anthropic_client.messages.create.call_args_list[1][1]
-        assert len(second_call_args["messages"]) == 3  # user + assistant + tool_result
+        # Shared read-only tool_choice is reused, not rebuilt
+        with pytest.raises(TypeError):
+            call_args["tool_choice"]["type"] = "any"
 
-        # Verify tool result message structure
-        tool_result_msg = second_call_args["messages"][2]
-        assert tool_result_msg["role"] == "user"
-        assert isinstance(tool_result_msg["content"], list)
-        assert tool_result_msg["content"][0]["type"] == "tool_result"
-
-    def test_tool_result_processing(
-        self, ai_generator_with_mock, mock_anthropic_client, tool_manager
+    def test_tool_definitions_cached(
+        self,
+        ai_generator_with_mock,
+        mock_anthropic_client,
+        frozen_tool_defs,
     ):
-        """Test that tool results are processed correctly"""
-        # Configure mocks
-        mock_tool_response = Mock()
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = "tool_xyz"
-        tool_block.input = {"query": "test"}
-        mock_tool_response.content = [tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-
-        mock_final = Mock()
-        mock_final.content = [Mock(text="Answer with tool results")]
-        mock_final.stop_reason = "end_turn"
-
-        mock_anthropic_client.messages.create.side_effect = [
-            mock_tool_response,
-            mock_final,
-        ]
+        """Test that the last tool definition carries a cache breakpoint"""
+        mock_anthropic_client.messages.create.side_effect = None
+        mock_anthropic_client.messages.create.return_value = _CANNED_OK
 
-        # Execute
-        response = ai_generator_with_mock.generate_response(
-            query="Query",
-            tools=tool_manager.get_tool_definitions(),
-            tool_manager=tool_manager,
-        )
+        tools = frozen_tool_defs
+        ai_generator_with_mock.generate_response(query="Test", tools=tools)
 
-        # Verify tool result was added to messages
-        second_call = mock_anthropic_client.messages.create.call_args_list[1][1]
-        tool_result = second_call["messages"][2]["content"][0]
+        call_args = mock_anthropic_client.messages.create.calls[-1]
+        assert call_args["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert all("cache_control" not in t for t in call_args["tools"][:-1])
 
-        assert tool_result["type"] == "tool_result"
-        assert tool_result["tool_use_id"] == "tool_xyz"
-        assert "content" in tool_result
+        # Caller's definitions must not be mutated
+        assert all("cache_control" not in t for t in tools)
+
+        # Same definitions object reuses the marked-up copy
+        ai_generator_with_mock.generate_response(query="Again", tools=tools)
+        second_call = mock_anthropic_client.messages.create.calls[-1]
+        assert second_call["tools"] is call_args["tools"]
 
 
 class TestAIGeneratorErrorHandling:
@@ -234,267 +286,272 @@ class TestAIGeneratorErrorHandling:
         assert "API Error" in str(exc_info.value)
 
     def test_tool_execution_error(
-        self, ai_generator_with_mock, mock_anthropic_client, tool_manager
+        self,
+        ai_generator_with_mock,
+        mock_anthropic_client,
+        failing_tool_manager,
+        frozen_tool_defs,
     ):
         """Test handling of tool execution errors"""
         # Configure mock for tool use
-        mock_tool_response = Mock()
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = "tool_123"
-        tool_block.input = {"query": "test"}
-        mock_tool_response.content = [tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-
-        mock_final = Mock()
-        mock_final.content = [Mock(text="Final answer")]
-        mock_final.stop_reason = "end_turn"
-
-        mock_anthropic_client.messages.create.side_effect = [
-            mock_tool_response,
-            mock_final,
-        ]
+        mock_tool_response = tool_use_response(
+            "search_course_content", "tool_123", {"query": "test"}
+        )
 
-        # Mock tool to raise error
-        with patch.object(
-            tool_manager, "execute_tool", side_effect=Exception("Tool failed")
-        ):
-            # Error should be handled gracefully (not raised)
-            response = ai_generator_with_mock.generate_response(
-                query="Test",
-                tools=tool_manager.get_tool_definitions(),
-                tool_manager=tool_manager,
-            )
+        mock_final = final_text_response("Final answer")
 
-            # Should still return a response
-            assert response == "Final answer"
+        queue_responses(mock_anthropic_client, mock_tool_response, mock_final)
 
-            # Verify error was passed to Claude as tool result
-            second_call = mock_anthropic_client.messages.create.call_args_list[1][1]
-            tool_results = second_call["messages"][2]["content"]
-            assert "is_error" in tool_results[0]
-            assert tool_results[0]["is_error"] is True
-            assert "Tool failed" in tool_results[0]["content"]
+        # Error should be handled gracefully (not raised)
+        response = ai_generator_with_mock.generate_response(
+            query="Test",
+            tools=frozen_tool_defs,
+            tool_manager=failing_tool_manager,
+        )
+
+        # Should still return a response
+        assert response == "Final answer"
 
+        # Verify error was passed to Claude as tool result
+        second_call = mock_anthropic_client.messages.create.calls[1]
+        tool_results = second_call["messages"][2]["content"]
+        assert "is_error" in tool_results[0]
+        assert tool_results[0]["is_error"] is True
+        assert "Tool failed" in tool_results[0]["content"]
+
+    @pytest.mark.slow
+    @pytest.mark.parametrize(
+        "tool_id,tool_input", [(None, {}), ("", None)], ids=["no_id", "no_input"]
+    )
     def test_malformed_tool_response(
-        self, ai_generator_with_mock, mock_anthropic_client, tool_manager
+        self,
+        ai_generator_with_mock,
+        mock_anthropic_client,
+        tool_manager,
+        frozen_tool_defs,
+        tool_id,
+        tool_input,
     ):
-        """Test handling of malformed tool responses"""
-        # Configure mock with malformed tool response
-        mock_tool_response = Mock()
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = None  # Missing ID
-        tool_block.input = {}  # Empty input
-        mock_tool_response.content = [tool_block]
-        mock_tool_response.stop_reason = "tool_use"
+        """Test that malformed tool calls still produce a text response"""
+        # Drop the queued defaults so every round, the final one included,
+        # gets the same malformed tool call and no text block
+        create = mock_anthropic_client.messages.create
+        create.set_responses([])
+        create.return_value = tool_use_response(
+            "search_course_content", tool_id, tool_input
+        )
 
-        mock_anthropic_client.messages.create.return_value = mock_tool_response
+        response = ai_generator_with_mock.generate_response(
+            query="Test",
+            tools=frozen_tool_defs,
+            tool_manager=tool_manager,
+        )
 
-        # Should handle gracefully or raise appropriate error
-        # This tests current behavior (may expose bugs)
-        try:
-            response = ai_generator_with_mock.generate_response(
-                query="Test",
-                tools=tool_manager.get_tool_definitions(),
-                tool_manager=tool_manager,
-            )
-            # If it succeeds, verify it handled the issue
-            assert isinstance(response, str)
-        except (AttributeError, KeyError, TypeError) as e:
-            # If it fails, this indicates missing validation
-            pytest.fail(f"Should handle malformed responses gracefully: {e}")
+        assert response == AIGenerator.NO_TEXT_RESPONSE
+        assert len(create.calls) == AIGenerator.MAX_TOOL_ROUNDS + 1
+
+    @pytest.mark.parametrize(
+        "tool_id,tool_input", [(None, {}), ("", None)], ids=["no_id", "no_input"]
+    )
+    async def test_malformed_tool_response_async(
+        self,
+        ai_generator_with_async_mock,
+        mock_async_anthropic_client,
+        tool_manager,
+        frozen_tool_defs,
+        tool_id,
+        tool_input,
+    ):
+        """Test that malformed tool calls are reported, not raised, when async"""
+        create = mock_async_anthropic_client.messages.create
+        create.return_value = tool_use_response(
+            "search_course_content", tool_id, tool_input
+        )
+
+        response = await ai_generator_with_async_mock.generate_response_async(
+            query="Test",
+            tools=frozen_tool_defs,
+            tool_manager=tool_manager,
+        )
+
+        assert response == AIGenerator.NO_TEXT_RESPONSE
+        assert create.await_count == AIGenerator.MAX_TOOL_ROUNDS + 1
+
+        # Every round answers the tool call with a tool_result
+        tool_results = create.call_args.kwargs["messages"][-1]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == [tool_id]
 
 
 class TestAIGeneratorParameters:
     """Tests for API parameters"""
 
-    def test_model_parameter(self, test_config, mock_anthropic_client):
-        """Test that correct model is used"""
+    def test_token_efficient_tools_beta(self, test_config, mock_anthropic_client):
+        """Test that Claude 3.7 tool calls go through the token-efficient beta"""
         generator = AIGenerator(
-            test_config.ANTHROPIC_API_KEY, test_config.ANTHROPIC_MODEL
+            test_config.ANTHROPIC_API_KEY, "claude-3-7-sonnet-latest"
         )
         generator.client = mock_anthropic_client
 
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Answer")]
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        mock_anthropic_client.beta.messages.create.return_value = _CANNED_OK
 
-        # Generate response
-        generator.generate_response(query="Test")
+        tools = [{"name": "test_tool", "description": "Test"}]
+        response = generator.generate_response(query="Test", tools=tools)
 
-        # Verify model parameter
-        call_args = mock_anthropic_client.messages.create.call_args[1]
-        assert call_args["model"] == test_config.ANTHROPIC_MODEL
+        assert response == "Answer"
+        mock_anthropic_client.messages.create.assert_not_called()
+        call_args = mock_anthropic_client.beta.messages.create.call_args.kwargs
+        _assert_standard_params(call_args, "claude-3-7-sonnet-latest")
+        assert call_args["betas"] == [AIGenerator.TOKEN_EFFICIENT_TOOLS_BETA]
+        assert "disable_parallel_tool_use" not in call_args["tool_choice"]
 
-    def test_temperature_parameter(self, ai_generator_with_mock, mock_anthropic_client):
-        """Test that temperature is set correctly"""
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Answer")]
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+    def test_token_efficient_tools_skipped_for_other_models(
+        self, ai_generator_with_mock, mock_anthropic_client
+    ):
+        """Test that the beta is not used for models with it built in"""
+        mock_anthropic_client.messages.create.side_effect = None
+        mock_anthropic_client.messages.create.return_value = _CANNED_OK
 
-        # Generate response
-        ai_generator_with_mock.generate_response(query="Test")
-
-        # Verify temperature
-        call_args = mock_anthropic_client.messages.create.call_args[1]
-        assert "temperature" in call_args
-        assert call_args["temperature"] == 0
-
-    def test_max_tokens_parameter(self, ai_generator_with_mock, mock_anthropic_client):
-        """Test that max_tokens is set correctly"""
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Answer")]
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        tools = [{"name": "test_tool", "description": "Test"}]
+        ai_generator_with_mock.generate_response(query="Test", tools=tools)
 
-        # Generate response
-        ai_generator_with_mock.generate_response(query="Test")
+        mock_anthropic_client.beta.messages.create.assert_not_called()
+        mock_anthropic_client.messages.create.assert_called_once()
+
+    def test_api_call_kwargs(
+        self, ai_generator_with_mock, mock_anthropic_client, test_config
+    ):
+        """Test model, sampling, system and tool_choice params in one call"""
+        mock_anthropic_client.messages.create.side_effect = None
+        mock_anthropic_client.messages.create.return_value = _CANNED_OK
+
+        tools = [{"name": "test_tool", "description": "Test"}]
+        ai_generator_with_mock.generate_response(query="Test", tools=tools)
 
-        # Verify max_tokens
-        call_args = mock_anthropic_client.messages.create.call_args[1]
-        assert "max_tokens" in call_args
-        assert call_args["max_tokens"] == 800
+        call_args = mock_anthropic_client.messages.create.calls[-1]
+        expected = {
+            "model": test_config.ANTHROPIC_MODEL,
+            "temperature": 0,
+            "max_tokens": 800,
+            "system": AIGenerator.SYSTEM_BLOCKS,
+            "tool_choice": {"type": "auto"},
+        }
+        assert {k: call_args[k] for k in expected} == expected
 
 
-class TestAIGeneratorSequentialToolCalling:
-    """Tests for sequential tool calling functionality"""
+def _check_two_calls(run):
+    """Initial call plus two tool rounds, tools offered while rounds remain"""
+    assert run.response == "Final answer after two tool calls"
+    assert len(run.calls) == 3
+    for kwargs in run.calls[:2]:
+        assert "tools" in kwargs
+        assert kwargs["tool_choice"]["type"] == "auto"
 
-    def test_sequential_two_tool_calls(
-        self, ai_generator_with_mock, mock_anthropic_client, tool_manager
-    ):
-        """Test that Claude can make 2 sequential tool calls"""
-        # Mock response 1: Claude requests first tool
-        mock_tool_response_1 = Mock()
-        tool_block_1 = Mock()
-        tool_block_1.type = "tool_use"
-        tool_block_1.name = "get_course_outline"
-        tool_block_1.id = "tool_001"
-        tool_block_1.input = {"course_name": "Machine Learning"}
-        mock_tool_response_1.content = [tool_block_1]
-        mock_tool_response_1.stop_reason = "tool_use"
-
-        # Mock response 2: After first tool, Claude requests second tool
-        mock_tool_response_2 = Mock()
-        tool_block_2 = Mock()
-        tool_block_2.type = "tool_use"
-        tool_block_2.name = "search_course_content"
-        tool_block_2.id = "tool_002"
-        tool_block_2.input = {"query": "supervised learning"}
-        mock_tool_response_2.content = [tool_block_2]
-        mock_tool_response_2.stop_reason = "tool_use"
-
-        # Mock response 3: Final text response
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Final answer after two tool calls")]
-        mock_final_response.stop_reason = "end_turn"
-
-        mock_anthropic_client.messages.create.side_effect = [
-            mock_tool_response_1,
-            mock_tool_response_2,
-            mock_final_response,
-        ]
 
-        # Execute
-        tools = tool_manager.get_tool_definitions()
-        response = ai_generator_with_mock.generate_response(
-            query="Search for a course that discusses the same topic as lesson 4 of Machine Learning",
-            tools=tools,
-            tool_manager=tool_manager,
-        )
+def _check_max_rounds(run):
+    """Third call cannot use tools and gets the smaller prose budget"""
+    final_call = run.calls[2]
+    assert "tools" not in final_call
+    assert "tool_choice" not in final_call
+    assert run.calls[1]["max_tokens"] == 800
+    assert final_call["max_tokens"] == AIGenerator.FINAL_MAX_TOKENS
+
+
+def _check_tools_preserved(run):
+    """Intermediate rounds reuse the same (cached) tool definitions"""
+    first_call, second_call = run.calls[0], run.calls[1]
+    assert [t["name"] for t in first_call["tools"]] == [t["name"] for t in run.tools]
+    assert second_call["tools"] == first_call["tools"]
 
-        # Verify response
-        assert response == "Final answer after two tool calls"
 
-        # Verify 3 API calls were made (initial + round 1 + round 2)
-        assert mock_anthropic_client.messages.create.call_count == 3
+def _check_context_accumulation(run):
+    """Each round appends its tool_use/tool_result pair to the conversation"""
+    assert run.roles[1] == ["user", "assistant", "user"]
+    assert run.roles[2] == ["user", "assistant", "user", "assistant", "user"]
 
-        # Verify tools parameter was included in first two calls
-        first_call = mock_anthropic_client.messages.create.call_args_list[0][1]
-        assert "tools" in first_call
-        assert first_call["tool_choice"]["type"] == "auto"
+    messages = run.calls[2]["messages"]
+    assert messages[2]["content"][0]["tool_use_id"] == run.tool_blocks[0].id
+    assert messages[4]["content"][0]["tool_use_id"] == run.tool_blocks[1].id
 
-        second_call = mock_anthropic_client.messages.create.call_args_list[1][1]
-        assert "tools" in second_call
-        assert second_call["tool_choice"]["type"] == "auto"
 
-    def test_max_rounds_enforced(
-        self, ai_generator_with_mock, mock_anthropic_client, tool_manager
+class TestAIGeneratorSequentialToolCalling:
+    """Tests for sequential tool calling functionality"""
+
+    @pytest.mark.parametrize(
+        "check",
+        [
+            _check_two_calls,
+            _check_max_rounds,
+            _check_tools_preserved,
+            _check_context_accumulation,
+        ],
+        ids=["two_calls", "max_rounds", "tools_preserved", "context_accumulation"],
+    )
+    def test_sequential_behavior(
+        self,
+        check,
+        ai_generator_with_mock,
+        mock_anthropic_client,
+        tool_manager,
+        sequential_three_round_mocks,
+        tool_definitions,
     ):
-        """Test that system stops after 2 tool rounds even if Claude wants more"""
-        # Mock: Each response keeps requesting tools
-        mock_tool_response_1 = Mock()
-        tool_block_1 = Mock()
-        tool_block_1.type = "tool_use"
-        tool_block_1.name = "search_course_content"
-        tool_block_1.id = "tool_001"
-        tool_block_1.input = {"query": "test1"}
-        mock_tool_response_1.content = [tool_block_1]
-        mock_tool_response_1.stop_reason = "tool_use"
-
-        mock_tool_response_2 = Mock()
-        tool_block_2 = Mock()
-        tool_block_2.type = "tool_use"
-        tool_block_2.name = "search_course_content"
-        tool_block_2.id = "tool_002"
-        tool_block_2.input = {"query": "test2"}
-        mock_tool_response_2.content = [tool_block_2]
-        mock_tool_response_2.stop_reason = "tool_use"
-
-        # After 2 rounds, final response (no more tool_use)
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Max rounds reached")]
-        mock_final_response.stop_reason = "end_turn"
-
-        mock_anthropic_client.messages.create.side_effect = [
-            mock_tool_response_1,
-            mock_tool_response_2,
-            mock_final_response,
-        ]
+        """Test two sequential tool rounds followed by a forced final answer"""
+        responses, tool_blocks = sequential_three_round_mocks
+        pending = iter(responses)
+        calls, roles = [], []
+
+        # The message list is shared across rounds, so snapshot roles per call
+        def record(**kwargs):
+            calls.append(kwargs)
+            roles.append([m["role"] for m in kwargs["messages"]])
+            return next(pending)
+
+        mock_anthropic_client.messages.create.side_effect = record
 
         # Execute
-        tools = tool_manager.get_tool_definitions()
+        tools = tool_definitions
         response = ai_generator_with_mock.generate_response(
-            query="Test query", tools=tools, tool_manager=tool_manager
+            query="Search for a course that discusses the same topic as lesson 4 of Machine Learning",
+            tools=tools,
+            tool_manager=tool_manager,
         )
 
-        # Verify exactly 3 API calls (initial + 2 rounds max)
-        assert mock_anthropic_client.messages.create.call_count == 3
-
-        # Verify third call does NOT include tools (max rounds reached)
-        third_call = mock_anthropic_client.messages.create.call_args_list[2][1]
-        assert "tools" not in third_call
+        check(
+            SimpleNamespace(
+                response=response,
+                calls=calls,
+                roles=roles,
+                tools=tools,
+                tool_blocks=tool_blocks,
+            )
+        )
 
     def test_early_termination_after_one_tool(
-        self, ai_generator_with_mock, mock_anthropic_client, tool_manager
+        self,
+        ai_generator_with_mock,
+        mock_anthropic_client,
+        tool_manager,
+        mock_response_factory,
+        tool_block_factory,
+        tool_definitions,
     ):
         """Test that system stops when Claude returns text instead of tool_use"""
         # Mock response 1: Tool use
-        mock_tool_response = Mock()
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = "tool_001"
-        tool_block.input = {"query": "test"}
-        mock_tool_response.content = [tool_block]
-        mock_tool_response.stop_reason = "tool_use"
+        mock_tool_response = mock_response_factory(
+            tool_use=[
+                tool_block_factory(
+                    "search_course_content", "tool_001", {"query": "test"}
+                )
+            ]
+        )
 
         # Mock response 2: Text response (no more tools)
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Answer after one tool")]
-        mock_final_response.stop_reason = "end_turn"
+        mock_final_response = mock_response_factory(text="Answer after one tool")
 
-        mock_anthropic_client.messages.create.side_effect = [
-            mock_tool_response,
-            mock_final_response,
-        ]
+        queue_responses(mock_anthropic_client, mock_tool_response, mock_final_response)
 
         # Execute
-        tools = tool_manager.get_tool_definitions()
+        tools = tool_definitions
         response = ai_generator_with_mock.generate_response(
             query="Simple query", tools=tools, tool_manager=tool_manager
         )
@@ -503,157 +560,314 @@ class TestAIGeneratorSequentialToolCalling:
         assert mock_anthropic_client.messages.create.call_count == 2
         assert response == "Answer after one tool"
 
-    def test_tools_parameter_preserved_in_rounds(
-        self, ai_generator_with_mock, mock_anthropic_client, tool_manager
+    def test_tool_execution_error_in_sequential_calls(
+        self,
+        ai_generator_with_mock,
+        mock_anthropic_client,
+        failing_tool_manager,
+        mock_response_factory,
+        tool_block_factory,
+        tool_definitions,
     ):
-        """Test that tools parameter is correctly included in intermediate rounds"""
-        # Mock tool responses
-        mock_tool_response_1 = Mock()
-        tool_block_1 = Mock()
-        tool_block_1.type = "tool_use"
-        tool_block_1.name = "search_course_content"
-        tool_block_1.id = "tool_001"
-        tool_block_1.input = {"query": "test1"}
-        mock_tool_response_1.content = [tool_block_1]
-        mock_tool_response_1.stop_reason = "tool_use"
-
-        mock_tool_response_2 = Mock()
-        tool_block_2 = Mock()
-        tool_block_2.type = "tool_use"
-        tool_block_2.name = "search_course_content"
-        tool_block_2.id = "tool_002"
-        tool_block_2.input = {"query": "test2"}
-        mock_tool_response_2.content = [tool_block_2]
-        mock_tool_response_2.stop_reason = "tool_use"
-
-        mock_final = Mock()
-        mock_final.content = [Mock(text="Done")]
-        mock_final.stop_reason = "end_turn"
-
-        mock_anthropic_client.messages.create.side_effect = [
-            mock_tool_response_1,
-            mock_tool_response_2,
-            mock_final,
-        ]
+        """Test graceful handling of tool execution errors in sequential calls"""
+        # Mock tool response that will cause error
+        mock_tool_response = mock_response_factory(
+            tool_use=[
+                tool_block_factory(
+                    "search_course_content", "tool_001", {"query": "test"}
+                )
+            ]
+        )
+
+        mock_final = mock_response_factory(text="Error handled")
+
+        queue_responses(mock_anthropic_client, mock_tool_response, mock_final)
 
         # Execute
-        tools = tool_manager.get_tool_definitions()
-        ai_generator_with_mock.generate_response(
-            query="Test", tools=tools, tool_manager=tool_manager
+        response = ai_generator_with_mock.generate_response(
+            query="Test", tools=tool_definitions, tool_manager=failing_tool_manager
         )
 
-        # Verify tools in first round
-        first_round_call = mock_anthropic_client.messages.create.call_args_list[0][1]
-        assert "tools" in first_round_call
-        assert first_round_call["tools"] == tools
+        # Should still return response
+        assert response == "Error handled"
+
+        # Verify error was included in tool result
+        second_call = mock_anthropic_client.messages.create.calls[1]
+        tool_results = second_call["messages"][2]["content"]
+        assert "is_error" in tool_results[0]
+        assert tool_results[0]["is_error"] is True
+        assert "Tool failed" in tool_results[0]["content"]
 
-        # Verify tools in second round
-        second_round_call = mock_anthropic_client.messages.create.call_args_list[1][1]
-        assert "tools" in second_round_call
-        assert second_round_call["tools"] == tools
 
-    def test_context_accumulation_across_rounds(
-        self, ai_generator_with_mock, mock_anthropic_client, tool_manager
+class TestAIGeneratorAsync:
+    """Tests for the async generation path"""
+
+    async def test_generate_async_without_tools(
+        self, ai_generator_with_async_mock, mock_async_anthropic_client
     ):
-        """Test that conversation context grows correctly across rounds"""
-        # Setup mocks
-        mock_tool_response_1 = Mock()
-        tool_block_1 = Mock()
-        tool_block_1.type = "tool_use"
-        tool_block_1.name = "search_course_content"
-        tool_block_1.id = "tool_001"
-        tool_block_1.input = {"query": "test1"}
-        mock_tool_response_1.content = [tool_block_1]
-        mock_tool_response_1.stop_reason = "tool_use"
-
-        mock_tool_response_2 = Mock()
-        tool_block_2 = Mock()
-        tool_block_2.type = "tool_use"
-        tool_block_2.name = "search_course_content"
-        tool_block_2.id = "tool_002"
-        tool_block_2.input = {"query": "test2"}
-        mock_tool_response_2.content = [tool_block_2]
-        mock_tool_response_2.stop_reason = "tool_use"
-
-        mock_final = Mock()
-        mock_final.content = [Mock(text="Done")]
-        mock_final.stop_reason = "end_turn"
-
-        mock_anthropic_client.messages.create.side_effect = [
-            mock_tool_response_1,
-            mock_tool_response_2,
-            mock_final,
+        """Test async direct response without tools"""
+        mock_response = final_text_response("Async answer")
+        mock_async_anthropic_client.messages.create.return_value = mock_response
+
+        response = await ai_generator_with_async_mock.generate_response_async(
+            query="What is machine learning?"
+        )
+
+        assert response == "Async answer"
+        assert mock_async_anthropic_client.messages.create.await_count == 1
+
+    async def test_parallel_tool_calls_in_one_round(
+        self,
+        ai_generator_with_async_mock,
+        mock_async_anthropic_client,
+        tool_manager,
+        tool_definitions,
+    ):
+        """Test that multiple tool calls in one round all produce ordered results"""
+        outline_block = ToolUseBlock(
+            "tool_use",
+            "get_course_outline",
+            "tool_outline",
+            {"course_name": "Machine Learning"},
+        )
+        search_block = ToolUseBlock(
+            "tool_use",
+            "search_course_content",
+            "tool_search",
+            {"query": "supervised learning"},
+        )
+        mock_tool_response = SimpleNamespace(
+            content=[outline_block, search_block], stop_reason="tool_use"
+        )
+
+        mock_final = final_text_response("Combined answer")
+
+        queue_responses(mock_async_anthropic_client, mock_tool_response, mock_final)
+
+        response = await ai_generator_with_async_mock.generate_response_async(
+            query="Outline and search",
+            tools=tool_definitions,
+            tool_manager=tool_manager,
+        )
+
+        assert response == "Combined answer"
+
+        second_call = nth_call_kwargs(mock_async_anthropic_client, 1)
+        tool_results = second_call["messages"][2]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == [
+            "tool_outline",
+            "tool_search",
         ]
+        assert "Course: Introduction to Machine Learning" in tool_results[0]["content"]
+        assert "Machine learning is a subset" in tool_results[1]["content"]
+
+    async def test_async_tool_execution_error(
+        self,
+        ai_generator_with_async_mock,
+        mock_async_anthropic_client,
+        failing_tool_manager,
+        tool_definitions,
+    ):
+        """Test that a failing tool becomes an error result in the async path"""
+        mock_tool_response = tool_use_response(
+            "search_course_content", "tool_123", {"query": "test"}
+        )
 
-        # Execute
-        tools = tool_manager.get_tool_definitions()
-        ai_generator_with_mock.generate_response(
-            query="Test query", tools=tools, tool_manager=tool_manager
+        mock_final = final_text_response("Final answer")
+
+        queue_responses(mock_async_anthropic_client, mock_tool_response, mock_final)
+
+        response = await ai_generator_with_async_mock.generate_response_async(
+            query="Test",
+            tools=tool_definitions,
+            tool_manager=failing_tool_manager,
         )
 
-        # Check message structure in second round call
-        second_call_messages = mock_anthropic_client.messages.create.call_args_list[1][
-            1
-        ]["messages"]
+        assert response == "Final answer"
+        second_call = nth_call_kwargs(mock_async_anthropic_client, 1)
+        tool_results = second_call["messages"][2]["content"]
+        assert tool_results[0]["is_error"] is True
+        assert "Tool failed" in tool_results[0]["content"]
+
+
+def _mock_stream(chunks, final_message):
+    """Build a mock messages.stream() context manager"""
+    stream = Mock()
+    stream.text_stream = iter(chunks)
+    stream.get_final_message.return_value = final_message
+    stream_manager = Mock()
+    stream_manager.__enter__ = Mock(return_value=stream)
+    stream_manager.__exit__ = Mock(return_value=False)
+    return stream_manager
+
+
+class TestAIGeneratorStreaming:
+    """Tests for streaming response generation"""
+
+    def test_stream_without_tools(self, ai_generator_with_mock, mock_anthropic_client):
+        """Test that a tool-less query is streamed directly"""
+        final = Mock()
+        final.stop_reason = "end_turn"
+        mock_anthropic_client.messages.stream.return_value = _mock_stream(
+            ["Direct ", "answer"], final
+        )
 
-        # Should have: initial user message, assistant tool_use, user tool_result
-        assert len(second_call_messages) == 3
-        assert second_call_messages[0]["role"] == "user"  # Initial query
-        assert second_call_messages[1]["role"] == "assistant"  # Tool use 1
-        assert second_call_messages[2]["role"] == "user"  # Tool result 1
+        chunks = list(
+            ai_generator_with_mock.generate_response_stream(query="What is ML?")
+        )
 
-        # Check message structure in third round call
-        third_call_messages = mock_anthropic_client.messages.create.call_args_list[2][
-            1
-        ]["messages"]
+        assert chunks == ["Direct ", "answer"]
+        mock_anthropic_client.messages.create.assert_not_called()
 
-        # Should have: initial user, assistant tool_use 1, user tool_result 1, assistant tool_use 2, user tool_result 2
-        assert len(third_call_messages) == 5
-        assert third_call_messages[0]["role"] == "user"  # Initial query
-        assert third_call_messages[1]["role"] == "assistant"  # Tool use 1
-        assert third_call_messages[2]["role"] == "user"  # Tool result 1
-        assert third_call_messages[3]["role"] == "assistant"  # Tool use 2
-        assert third_call_messages[4]["role"] == "user"  # Tool result 2
+    def test_stream_after_tool_use(
+        self,
+        ai_generator_with_mock,
+        mock_anthropic_client,
+        tool_manager,
+        tool_definitions,
+    ):
+        """Test that tool use is detected first, then the synthesis is streamed"""
+        mock_tool_response = tool_use_response(
+            "search_course_content", "tool_123", {"query": "machine learning"}
+        )
+        mock_anthropic_client.messages.create.side_effect = None
+        mock_anthropic_client.messages.create.return_value = mock_tool_response
 
-    def test_tool_execution_error_in_sequential_calls(
-        self, ai_generator_with_mock, mock_anthropic_client, tool_manager
+        final = Mock()
+        final.stop_reason = "end_turn"
+        mock_anthropic_client.messages.stream.return_value = _mock_stream(
+            ["Based on ", "the course"], final
+        )
+
+        chunks = list(
+            ai_generator_with_mock.generate_response_stream(
+                query="What is ML in the course?",
+                tools=tool_definitions,
+                tool_manager=tool_manager,
+            )
+        )
+
+        assert chunks == ["Based on ", "the course"]
+        assert mock_anthropic_client.messages.create.call_count == 1
+
+        # Streamed call carries the tool results
+        stream_call = mock_anthropic_client.messages.stream.call_args.kwargs
+        tool_result = stream_call["messages"][2]["content"][0]
+        assert tool_result["type"] == "tool_result"
+        assert tool_result["tool_use_id"] == "tool_123"
+
+    def test_stream_direct_answer_with_tools(
+        self,
+        ai_generator_with_mock,
+        mock_anthropic_client,
+        tool_manager,
+        tool_definitions,
     ):
-        """Test graceful handling of tool execution errors in sequential calls"""
-        # Mock tool response that will cause error
-        mock_tool_response = Mock()
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = "tool_001"
-        tool_block.input = {"query": "test"}
-        mock_tool_response.content = [tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-
-        mock_final = Mock()
-        mock_final.content = [Mock(text="Error handled")]
-        mock_final.stop_reason = "end_turn"
-
-        mock_anthropic_client.messages.create.side_effect = [
-            mock_tool_response,
-            mock_final,
-        ]
+        """Test that a direct answer to a tool-enabled query is yielded whole"""
+        mock_response = final_text_response("General answer")
+        mock_anthropic_client.messages.create.side_effect = None
+        mock_anthropic_client.messages.create.return_value = mock_response
+
+        chunks = list(
+            ai_generator_with_mock.generate_response_stream(
+                query="What is 2+2?",
+                tools=tool_definitions,
+                tool_manager=tool_manager,
+            )
+        )
+
+        assert chunks == ["General answer"]
+        mock_anthropic_client.messages.stream.assert_not_called()
+
+
+class TestAIGeneratorBatch:
+    """Tests for Message Batches API generation"""
+
+    def _batch_entry(self, custom_id, text=None):
+        """Build a batch result entry, succeeded when text is given"""
+        entry = Mock()
+        entry.custom_id = custom_id
+        entry.result.type = "succeeded" if text is not None else "errored"
+        entry.result.message.content = [TextBlock(text)]
+        return entry
+
+    def test_batch_responses_in_query_order(
+        self, ai_generator_with_mock, mock_anthropic_client
+    ):
+        """Test that results are mapped back to query order and failures are empty"""
+        batches = mock_anthropic_client.messages.batches
+        batches.create.return_value = Mock(
+            id="batch_1", processing_status="in_progress"
+        )
+        batches.retrieve.return_value = Mock(id="batch_1", processing_status="ended")
+        batches.results.return_value = iter(
+            [
+                self._batch_entry("2", "Third"),
+                self._batch_entry("0", "First"),
+                self._batch_entry("1"),
+            ]
+        )
 
-        # Mock tool to raise error
-        with patch.object(
-            tool_manager, "execute_tool", side_effect=Exception("Tool error")
-        ):
-            # Execute
-            tools = tool_manager.get_tool_definitions()
-            response = ai_generator_with_mock.generate_response(
-                query="Test", tools=tools, tool_manager=tool_manager
+        with patch("ai_generator.time.sleep") as mock_sleep:
+            responses = ai_generator_with_mock.generate_responses_batch(
+                ["Q1", "Q2", "Q3"]
             )
 
-            # Should still return response
-            assert response == "Error handled"
+        assert responses == ["First", "", "Third"]
+        mock_sleep.assert_called_once_with(AIGenerator.BATCH_POLL_INTERVAL)
+        batches.results.assert_called_once_with("batch_1")
+
+        requests = batches.create.call_args.kwargs["requests"]
+        assert [r["custom_id"] for r in requests] == ["0", "1", "2"]
+        assert requests[1]["params"]["messages"] == [{"role": "user", "content": "Q2"}]
+        assert "tools" not in requests[1]["params"]
+
+
+class TestAIGeneratorOverHTTP:
+    """Tests running the real Anthropic SDK against an in-memory transport"""
+
+    def test_direct_response_request_body(
+        self, ai_generator_with_transport, messages_transport
+    ):
+        """Test the serialized request and parsed response for a direct answer"""
+        messages_transport.queue_text("Direct answer")
+
+        response = ai_generator_with_transport.generate_response(query="What is ML?")
+
+        assert response == "Direct answer"
+        (body,) = messages_transport.requests
+        assert body["messages"] == [{"role": "user", "content": "What is ML?"}]
+        assert body["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert "tools" not in body
+
+    def test_tool_round_trip_request_bodies(
+        self,
+        ai_generator_with_transport,
+        messages_transport,
+        tool_manager,
+        tool_definitions,
+    ):
+        """Test that parsed tool_use blocks are sent back with their results"""
+        messages_transport.queue_tool_use(
+            "search_course_content", "toolu_01", {"query": "machine learning"}
+        )
+        messages_transport.queue_text("Based on the course materials...")
+
+        response = ai_generator_with_transport.generate_response(
+            query="What is ML in the course?",
+            tools=tool_definitions,
+            tool_manager=tool_manager,
+        )
 
-            # Verify error was included in tool result
-            second_call = mock_anthropic_client.messages.create.call_args_list[1][1]
-            tool_results = second_call["messages"][2]["content"]
-            assert "is_error" in tool_results[0]
-            assert tool_results[0]["is_error"] is True
-            assert "Tool error" in tool_results[0]["content"]
+        assert response == "Based on the course materials..."
+        first, second = messages_transport.requests
+        assert first["tool_choice"] == {"type": "auto"}
+        assert first["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+
+        # SDK content blocks from the first response serialize back to JSON
+        assistant, tool_results = second["messages"][1], second["messages"][2]
+        assert assistant["role"] == "assistant"
+        assert assistant["content"][0]["type"] == "tool_use"
+        assert assistant["content"][0]["id"] == "toolu_01"
+        assert tool_results["content"][0]["type"] == "tool_result"
+        assert tool_results["content"][0]["tool_use_id"] == "toolu_01"
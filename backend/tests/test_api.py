@@ -1,20 +1,52 @@
 """API endpoint tests for FastAPI application"""
+import asyncio
+import json
+
 import pytest
 from unittest.mock import Mock
 from httpx import AsyncClient
 
+# Share the session event loop with the session-scoped test client
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+# Fixed request bodies, encoded once instead of on every post
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_PAYLOAD_TEST = json.dumps({"query": "Test"}).encode()
+_PAYLOAD_TEST_QUERY = json.dumps({"query": "Test query"}).encode()
+
+# Large fixed inputs, built once
+_LONG_QUERY = "What is machine learning? " * 1000
+_MANY_COURSES = [f"Course {i}" for i in range(50)]
+
 
 @pytest.mark.api
 class TestQueryEndpoint:
     """Tests for /api/query endpoint"""
 
-    async def test_query_endpoint_success(self, test_app, test_client):
+    # Canned (answer, sources) results; the handler only reads them
+    _ML_RESPONSE = (
+        "Machine learning is a subset of artificial intelligence.",
+        ({"text": "ML Course - Lesson 0", "link": "https://example.com/lesson-0"},)
+    )
+    _MULTI_SOURCE_RESPONSE = (
+        "Machine learning includes supervised and unsupervised learning.",
+        tuple(
+            {"text": f"ML Course - Lesson {i}", "link": f"https://example.com/lesson-{i}"}
+            for i in range(3)
+        )
+    )
+    _UNLINKED_RESPONSE = (
+        "Answer from general content",
+        (
+            {"text": "General reference", "link": None},
+            {"text": "Another reference", "link": None}
+        )
+    )
+
+    async def test_query_endpoint_success(self, test_app, rag_returns, test_client):
         """Test successful query with response"""
         # Configure mock RAG system
-        test_app.state.mock_rag.query.return_value = (
-            "Machine learning is a subset of artificial intelligence.",
-            [{"text": "ML Course - Lesson 0", "link": "https://example.com/lesson-0"}]
-        )
+        rag_returns.query(*self._ML_RESPONSE)
 
         # Make request
         response = await test_client.post(
@@ -40,23 +72,21 @@ class TestQueryEndpoint:
         assert data["session_id"] == "test_session_1"
 
         # Verify RAG system was called correctly
-        test_app.state.mock_rag.query.assert_called_once_with(
+        test_app.state.mock_rag.query_async.assert_called_once_with(
             "What is machine learning?",
             "test_session_1"
         )
 
-    async def test_query_endpoint_without_session_id(self, test_app, test_client):
+    async def test_query_endpoint_without_session_id(self, rag_returns, test_client):
         """Test query endpoint creates session when not provided"""
         # Configure mock
-        test_app.state.mock_rag.query.return_value = (
-            "Answer without session",
-            []
-        )
+        rag_returns.query("Answer without session")
 
         # Make request without session_id
         response = await test_client.post(
             "/api/query",
-            json={"query": "Test query"}
+            content=_PAYLOAD_TEST_QUERY,
+            headers=_JSON_HEADERS
         )
 
         # Verify response
@@ -67,154 +97,142 @@ class TestQueryEndpoint:
         assert "session_id" in data
         assert data["session_id"] == "test_session_1"
 
-    async def test_query_endpoint_with_multiple_sources(self, test_app, test_client):
+    async def test_query_endpoint_with_multiple_sources(self, rag_returns, direct_query):
         """Test query endpoint with multiple source citations"""
         # Configure mock with multiple sources
-        test_app.state.mock_rag.query.return_value = (
-            "Machine learning includes supervised and unsupervised learning.",
-            [
-                {"text": "ML Course - Lesson 0", "link": "https://example.com/lesson-0"},
-                {"text": "ML Course - Lesson 1", "link": "https://example.com/lesson-1"},
-                {"text": "ML Course - Lesson 2", "link": "https://example.com/lesson-2"}
-            ]
-        )
+        rag_returns.query(*self._MULTI_SOURCE_RESPONSE)
 
-        # Make request
-        response = await test_client.post(
-            "/api/query",
-            json={"query": "Types of machine learning"}
-        )
+        # Call the handler
+        result = await direct_query("Types of machine learning")
 
         # Verify response
-        assert response.status_code == 200
-        data = response.json()
-
-        assert len(data["sources"]) == 3
-        for i, source in enumerate(data["sources"]):
-            assert "text" in source
-            assert "link" in source
-            assert f"Lesson {i}" in source["text"]
+        assert len(result.sources) == 3
+        for i, source in enumerate(result.sources):
+            assert source.link == f"https://example.com/lesson-{i}"
+            assert f"Lesson {i}" in source.text
 
-    async def test_query_endpoint_with_sources_without_links(self, test_app, test_client):
+    async def test_query_endpoint_with_sources_without_links(self, rag_returns, direct_query):
         """Test query endpoint with sources that have no links"""
         # Configure mock with sources without links
-        test_app.state.mock_rag.query.return_value = (
-            "Answer from general content",
-            [
-                {"text": "General reference", "link": None},
-                {"text": "Another reference", "link": None}
-            ]
-        )
+        rag_returns.query(*self._UNLINKED_RESPONSE)
 
-        # Make request
-        response = await test_client.post(
-            "/api/query",
-            json={"query": "Test query"}
-        )
+        # Call the handler
+        result = await direct_query("Test query")
 
         # Verify response
-        assert response.status_code == 200
-        data = response.json()
-
-        assert len(data["sources"]) == 2
-        for source in data["sources"]:
-            assert source["link"] is None
+        assert len(result.sources) == 2
+        for source in result.sources:
+            assert source.link is None
 
-    async def test_query_endpoint_empty_query(self, test_app, test_client):
+    async def test_query_endpoint_empty_query(self, rag_returns, test_client):
         """Test query endpoint with empty query string"""
         # Configure mock to handle empty query
-        test_app.state.mock_rag.query.return_value = (
-            "Please provide a question.",
-            []
-        )
+        rag_returns.query("Please provide a question.")
 
         # Make request with empty query
-        response = await test_client.post(
-            "/api/query",
-            json={"query": ""}
-        )
-
         # Should still succeed (validation happens in RAG system)
-        assert response.status_code == 200
-
-    async def test_query_endpoint_error_handling(self, test_app, test_client):
-        """Test query endpoint error handling"""
-        # Configure mock to raise exception
-        test_app.state.mock_rag.query.side_effect = Exception("Database connection error")
-
-        # Make request
-        response = await test_client.post(
+        assert (await test_client.post(
             "/api/query",
-            json={"query": "Test query"}
-        )
-
-        # Verify error response
-        assert response.status_code == 500
-        data = response.json()
-        assert "detail" in data
-        assert "Database connection error" in data["detail"]
+            json={"query": ""}
+        )).status_code == 200
 
     async def test_query_endpoint_invalid_request_format(self, test_client):
         """Test query endpoint with invalid request format"""
         # Make request with missing required field
-        response = await test_client.post(
+        # Should return validation error
+        assert (await test_client.post(
             "/api/query",
             json={"session_id": "test"}  # Missing 'query' field
-        )
-
-        # Should return validation error
-        assert response.status_code == 422
+        )).status_code == 422
 
     async def test_query_endpoint_invalid_json(self, test_client):
         """Test query endpoint with invalid JSON"""
         # Make request with invalid JSON
-        response = await test_client.post(
+        # Should return error
+        assert (await test_client.post(
             "/api/query",
             content="not valid json",
             headers={"Content-Type": "application/json"}
-        )
-
-        # Should return error
-        assert response.status_code == 422
+        )).status_code == 422
 
-    async def test_query_endpoint_no_sources(self, test_app, test_client):
+    async def test_query_endpoint_no_sources(self, rag_returns, direct_query):
         """Test query endpoint when no sources are returned"""
         # Configure mock with empty sources
-        test_app.state.mock_rag.query.return_value = (
-            "This is a general knowledge answer.",
-            []
-        )
+        rag_returns.query("This is a general knowledge answer.")
+
+        # Call the handler
+        result = await direct_query("What is 2+2?")
+
+        # Verify response
+        assert result.answer == "This is a general knowledge answer."
+        assert result.sources == []
+        assert result.session_id == "test_session_1"
+
+
+@pytest.mark.api
+class TestQueryStreamEndpoint:
+    """Tests for /api/query/stream endpoint"""
+
+    async def test_query_stream_success(self, test_app, test_client):
+        """Test that text chunks and a final done event are streamed"""
+        # Configure mock RAG system
+        test_app.state.mock_rag.query_stream.return_value = iter([
+            {"type": "text", "text": "Machine learning "},
+            {"type": "text", "text": "is a subset of AI."},
+            {"type": "done", "sources": [{"text": "ML Course - Lesson 0", "link": None}]},
+        ])
 
         # Make request
         response = await test_client.post(
-            "/api/query",
-            json={"query": "What is 2+2?"}
+            "/api/query/stream",
+            json={"query": "What is machine learning?", "session_id": "stream_1"}
         )
 
         # Verify response
         assert response.status_code == 200
-        data = response.json()
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = [
+            json.loads(line[len("data: "):])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        text = "".join(e["text"] for e in events if e["type"] == "text")
+        assert text == "Machine learning is a subset of AI."
+        assert events[-1]["type"] == "done"
+        assert events[-1]["session_id"] == "stream_1"
+        assert events[-1]["sources"][0]["text"] == "ML Course - Lesson 0"
+
+    async def test_query_stream_error_event(self, test_app, test_client):
+        """Test that failures during streaming are reported as an error event"""
+        # Configure mock to raise exception
+        test_app.state.mock_rag.query_stream.side_effect = Exception("Stream failed")
 
-        assert data["answer"] == "This is a general knowledge answer."
-        assert data["sources"] == []
-        assert "session_id" in data
+        # Make request
+        response = await test_client.post(
+            "/api/query/stream",
+            content=_PAYLOAD_TEST_QUERY,
+            headers=_JSON_HEADERS
+        )
+
+        # Headers are already sent, so the error arrives in the stream
+        assert response.status_code == 200
+        event = json.loads(response.text.removeprefix("data: "))
+        assert event == {"type": "error", "detail": "Stream failed"}
 
 
 @pytest.mark.api
 class TestCoursesEndpoint:
     """Tests for /api/courses endpoint"""
 
-    async def test_courses_endpoint_success(self, test_app, test_client):
+    async def test_courses_endpoint_success(self, rag_returns, test_client):
         """Test successful retrieval of course statistics"""
         # Configure mock
-        test_app.state.mock_rag.get_course_analytics.return_value = {
-            "total_courses": 3,
-            "course_titles": [
-                "Introduction to Machine Learning",
-                "Deep Learning Fundamentals",
-                "Natural Language Processing"
-            ]
-        }
+        rag_returns.analytics([
+            "Introduction to Machine Learning",
+            "Deep Learning Fundamentals",
+            "Natural Language Processing"
+        ])
 
         # Make request
         response = await test_client.get("/api/courses")
@@ -230,13 +248,10 @@ class TestCoursesEndpoint:
         assert len(data["course_titles"]) == 3
         assert "Introduction to Machine Learning" in data["course_titles"]
 
-    async def test_courses_endpoint_no_courses(self, test_app, test_client):
+    async def test_courses_endpoint_no_courses(self, rag_returns, test_client):
         """Test courses endpoint when no courses exist"""
         # Configure mock with empty courses
-        test_app.state.mock_rag.get_course_analytics.return_value = {
-            "total_courses": 0,
-            "course_titles": []
-        }
+        rag_returns.analytics([])
 
         # Make request
         response = await test_client.get("/api/courses")
@@ -248,14 +263,10 @@ class TestCoursesEndpoint:
         assert data["total_courses"] == 0
         assert data["course_titles"] == []
 
-    async def test_courses_endpoint_many_courses(self, test_app, test_client):
+    async def test_courses_endpoint_many_courses(self, rag_returns, test_client):
         """Test courses endpoint with many courses"""
         # Configure mock with many courses
-        course_titles = [f"Course {i}" for i in range(50)]
-        test_app.state.mock_rag.get_course_analytics.return_value = {
-            "total_courses": 50,
-            "course_titles": course_titles
-        }
+        rag_returns.analytics(_MANY_COURSES)
 
         # Make request
         response = await test_client.get("/api/courses")
@@ -267,21 +278,6 @@ class TestCoursesEndpoint:
         assert data["total_courses"] == 50
         assert len(data["course_titles"]) == 50
 
-    async def test_courses_endpoint_error_handling(self, test_app, test_client):
-        """Test courses endpoint error handling"""
-        # Configure mock to raise exception
-        test_app.state.mock_rag.get_course_analytics.side_effect = Exception(
-            "Vector store error"
-        )
-
-        # Make request
-        response = await test_client.get("/api/courses")
-
-        # Verify error response
-        assert response.status_code == 500
-        data = response.json()
-        assert "detail" in data
-        assert "Vector store error" in data["detail"]
 
 
 @pytest.mark.api
@@ -306,7 +302,7 @@ class TestCORSMiddleware:
     async def test_cors_allows_post_requests(self, test_app, test_client):
         """Test that CORS allows POST requests"""
         # Configure mock
-        test_app.state.mock_rag.query.return_value = ("Answer", [])
+        test_app.state.mock_rag.query_async.return_value = ("Answer", [])
 
         # Make POST request with origin header
         response = await test_client.post(
@@ -327,61 +323,52 @@ class TestRequestValidation:
     async def test_query_with_wrong_data_types(self, test_client):
         """Test query endpoint with wrong data types"""
         # Make request with integer instead of string
-        response = await test_client.post(
+        # Should return validation error
+        assert (await test_client.post(
             "/api/query",
             json={"query": 123}  # Should be string
-        )
-
-        # Should return validation error
-        assert response.status_code == 422
+        )).status_code == 422
 
     async def test_query_with_extra_fields(self, test_app, test_client):
         """Test query endpoint ignores extra fields"""
         # Configure mock
-        test_app.state.mock_rag.query.return_value = ("Answer", [])
+        test_app.state.mock_rag.query_async.return_value = ("Answer", [])
 
         # Make request with extra fields
-        response = await test_client.post(
+        # Should succeed (extra fields ignored by Pydantic)
+        assert (await test_client.post(
             "/api/query",
             json={
                 "query": "Test",
                 "extra_field": "ignored",
                 "another_field": 123
             }
-        )
-
-        # Should succeed (extra fields ignored by Pydantic)
-        assert response.status_code == 200
+        )).status_code == 200
 
     async def test_query_with_very_long_string(self, test_app, test_client):
         """Test query endpoint with very long query string"""
         # Configure mock
-        test_app.state.mock_rag.query.return_value = ("Answer", [])
+        test_app.state.mock_rag.query_async.return_value = ("Answer", [])
 
         # Make request with very long query
-        long_query = "What is machine learning? " * 1000
-        response = await test_client.post(
-            "/api/query",
-            json={"query": long_query}
-        )
-
         # Should succeed (no length limit in model)
-        assert response.status_code == 200
+        assert (await test_client.post(
+            "/api/query",
+            json={"query": _LONG_QUERY}
+        )).status_code == 200
 
     async def test_query_with_special_characters(self, test_app, test_client):
         """Test query endpoint with special characters"""
         # Configure mock
-        test_app.state.mock_rag.query.return_value = ("Answer", [])
+        test_app.state.mock_rag.query_async.return_value = ("Answer", [])
 
         # Make request with special characters
-        response = await test_client.post(
+        # Should succeed
+        assert (await test_client.post(
             "/api/query",
             json={"query": "What is ML? 你好 🤖 <script>alert('test')</script>"}
-        )
-
-        # Should succeed
-        assert response.status_code == 200
-        assert test_app.state.mock_rag.query.called
+        )).status_code == 200
+        assert test_app.state.mock_rag.query_async.called
 
 
 @pytest.mark.api
@@ -391,72 +378,85 @@ class TestEndpointIntegration:
     async def test_query_then_courses(self, test_app, test_client):
         """Test querying then getting course stats"""
         # Configure mocks
-        test_app.state.mock_rag.query.return_value = ("Answer", [])
+        test_app.state.mock_rag.query_async.return_value = ("Answer", [])
         test_app.state.mock_rag.get_course_analytics.return_value = {
             "total_courses": 1,
             "course_titles": ["ML Course"]
         }
 
         # Make query request
-        query_response = await test_client.post(
+        assert (await test_client.post(
             "/api/query",
-            json={"query": "Test"}
-        )
-        assert query_response.status_code == 200
+            content=_PAYLOAD_TEST,
+            headers=_JSON_HEADERS
+        )).status_code == 200
 
         # Make courses request
-        courses_response = await test_client.get("/api/courses")
-        assert courses_response.status_code == 200
+        assert (await test_client.get("/api/courses")).status_code == 200
 
-    async def test_multiple_queries_same_session(self, test_app, test_client):
+    async def test_multiple_queries_same_session(self, test_app, direct_query):
         """Test multiple queries with the same session ID"""
         # Configure mock
-        test_app.state.mock_rag.query.return_value = ("Answer", [])
+        test_app.state.mock_rag.query_async.return_value = ("Answer", [])
 
         # First query
-        response1 = await test_client.post(
-            "/api/query",
-            json={"query": "First question", "session_id": "session_123"}
-        )
-        assert response1.status_code == 200
-        assert response1.json()["session_id"] == "session_123"
+        result1 = await direct_query("First question", "session_123")
+        assert result1.session_id == "session_123"
 
         # Second query with same session
-        response2 = await test_client.post(
-            "/api/query",
-            json={"query": "Second question", "session_id": "session_123"}
-        )
-        assert response2.status_code == 200
-        assert response2.json()["session_id"] == "session_123"
+        result2 = await direct_query("Second question", "session_123")
+        assert result2.session_id == "session_123"
 
         # Verify both calls were made
-        assert test_app.state.mock_rag.query.call_count == 2
+        assert test_app.state.mock_rag.query_async.call_count == 2
 
     async def test_concurrent_sessions(self, test_app, test_client):
         """Test handling multiple concurrent sessions"""
-        # Configure mock
-        test_app.state.mock_rag.query.return_value = ("Answer", [])
-
-        # Make requests with different sessions
-        response1 = await test_client.post(
-            "/api/query",
-            json={"query": "Query A", "session_id": "session_A"}
-        )
-        response2 = await test_client.post(
-            "/api/query",
-            json={"query": "Query B", "session_id": "session_B"}
-        )
-        response3 = await test_client.post(
-            "/api/query",
-            json={"query": "Query C", "session_id": "session_C"}
+        # Answer depends on the query so crossed-over responses would show
+        test_app.state.mock_rag.query_async.side_effect = (
+            lambda query, session_id: (f"Answer to {query}", [])
         )
 
-        # All should succeed
-        assert response1.status_code == 200
-        assert response2.status_code == 200
-        assert response3.status_code == 200
+        # Make overlapping requests with different sessions
+        sessions = {"Query A": "session_A", "Query B": "session_B", "Query C": "session_C"}
+        responses = await asyncio.gather(*(
+            test_client.post("/api/query", json={"query": query, "session_id": session_id})
+            for query, session_id in sessions.items()
+        ))
+
+        # Each should keep its own session ID and answer
+        for (query, session_id), response in zip(sessions.items(), responses, strict=True):
+            assert response.status_code == 200
+            data = response.json()
+            assert data["session_id"] == session_id
+            assert data["answer"] == f"Answer to {query}"
+
+    @pytest.mark.parametrize(
+        "method,path,request_kwargs,attr,message",
+        [
+            (
+                "POST",
+                "/api/query",
+                {"content": _PAYLOAD_TEST_QUERY, "headers": _JSON_HEADERS},
+                "query_async",
+                "Database connection error"
+            ),
+            ("GET", "/api/courses", {}, "get_course_analytics", "Vector store error")
+        ],
+        ids=["query", "courses"]
+    )
+    async def test_endpoint_error_handling(
+        self, test_app, test_client, method, path, request_kwargs, attr, message
+    ):
+        """Test that RAG failures become 500 responses carrying the error"""
+        # Configure mock to raise exception
+        getattr(test_app.state.mock_rag, attr).side_effect = Exception(message)
+
+        # Make request
+        response = await test_client.request(method, path, **request_kwargs)
 
-        # Each should maintain their session ID
-        assert response1.json()["session_id"] == "session_A"
-        assert response2.json()["session_id"] == "session_B"
-        assert response3.json()["session_id"] == "session_C"
+        # Verify error response
+        assert response.status_code == 500
+        data = response.json()
+        assert "detail" in data
+        assert message in data["detail"]
@@ -1,424 +1,451 @@
 """Integration tests for RAG system"""
 
-from unittest.mock import MagicMock, Mock, patch
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import ANY, DEFAULT, AsyncMock, patch
 
 import pytest
 from config import Config
-from rag_system import RAGSystem
+from rag_system import QUERY_TOO_LONG, RAGSystem
+from session_manager import SessionManager
+from vector_store import SearchResults
 
+# Shared, never mutated: real results and sources instead of per-test Mocks
+_ML_SEARCH_RESULT = SearchResults(
+    documents=["Machine learning content"],
+    metadata=[{"course_title": "ML Course", "lesson_number": 0}],
+    distances=[0.1],
+)
+_ML_SOURCES = [{"text": "ML Course - Lesson 0", "link": "https://example.com/lesson-0"}]
 
-class TestRAGSystemContentQueries:
-    """Tests for content-related query handling"""
+_LONG_QUERY = "What is machine learning? " * 100
 
-    def test_content_query_flow(self, test_config):
-        """Test end-to-end content query flow"""
-        # Create RAG system with mocked components
-        with (
-            patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-        ):
-
-            # Configure mocks
-            mock_store = MockVectorStore.return_value
-            mock_store.search.return_value = Mock(
-                documents=["Machine learning content"],
-                metadata=[{"course_title": "ML Course", "lesson_number": 0}],
-                distances=[0.1],
-                error=None,
-                is_empty=Mock(return_value=False),
-            )
-            mock_store._resolve_course_name.return_value = "ML Course"
-            mock_store.get_lesson_link.return_value = "https://example.com/lesson-0"
-
-            mock_ai = MockAIGenerator.return_value
-            mock_ai.generate_response.return_value = (
-                "Machine learning is a subset of AI..."
-            )
-
-            # Create system and execute query
-            rag = RAGSystem(test_config)
-            answer, sources = rag.query(
-                "What is machine learning?", session_id="test_1"
-            )
-
-            # Verify response
-            assert isinstance(answer, str)
-            assert len(answer) > 0
-
-            # Verify AI generator was called with tools
-            mock_ai.generate_response.assert_called_once()
-            call_kwargs = mock_ai.generate_response.call_args[1]
-            assert "tools" in call_kwargs
-            assert "tool_manager" in call_kwargs
-
-    def test_content_query_with_sources(self, test_config):
-        """Test that sources are returned correctly"""
-        with (
-            patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-        ):
-
-            # Configure mocks to simulate tool use
-            mock_store = MockVectorStore.return_value
-            mock_ai = MockAIGenerator.return_value
-
-            # Simulate tool execution by directly calling search tool
-            rag = RAGSystem(test_config)
-
-            # Mock the search tool to populate sources
-            rag.search_tool.last_sources = [
-                {"text": "ML Course - Lesson 0", "link": "https://example.com/lesson-0"}
-            ]
 
-            # Mock AI response
-            mock_ai.generate_response.return_value = "Answer based on course materials"
+class _Contains(str):
+    """Call matcher equal to any string that contains it"""
 
-            # Execute query
-            answer, sources = rag.query("Test query", session_id="test_2")
+    def __eq__(self, other):
+        return isinstance(other, str) and self in other
 
-            # Verify sources were returned
-            assert isinstance(sources, list)
+    __hash__ = str.__hash__
 
-    def test_empty_results_handling(self, test_config):
-        """Test handling when search returns no results"""
-        with (
-            patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-        ):
 
-            mock_store = MockVectorStore.return_value
-            mock_ai = MockAIGenerator.return_value
+@pytest.fixture(scope="module")
+def _patched_rag(test_config):
+    """One RAGSystem for the module, built over patched external components"""
+    with patch.multiple(
+        "rag_system",
+        VectorStore=DEFAULT,
+        AIGenerator=DEFAULT,
+        DocumentProcessor=DEFAULT,
+    ) as mocks:
+        rag = RAGSystem(test_config)
+        yield rag, mocks["VectorStore"].return_value, mocks["AIGenerator"].return_value
 
-            # Configure AI to handle empty search
-            mock_ai.generate_response.return_value = (
-                "No relevant content found in the courses."
-            )
 
-            rag = RAGSystem(test_config)
-            answer, sources = rag.query("Nonexistent topic", session_id="test_3")
+@pytest.fixture
+def rag_mocks(_patched_rag):
+    """Shared (rag, mock_store, mock_ai) with mocks, sessions and sources reset"""
+    rag, mock_store, mock_ai = _patched_rag
+    mock_store.reset_mock(return_value=True, side_effect=True)
+    mock_ai.reset_mock(return_value=True, side_effect=True)
+    rag.session_manager.sessions.clear()
+    rag.tool_manager.reset_sources()
+    return rag, mock_store, mock_ai
 
-            # Should still return an answer
-            assert isinstance(answer, str)
-            assert len(answer) > 0
 
-    def test_error_propagation(self, test_config):
-        """Test error propagation through the stack"""
-        with (
-            patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-        ):
+class TestRAGSystemContentQueries:
+    """Tests for content-related query handling"""
+
+    def test_content_query_flow(self, rag_mocks):
+        """Test end-to-end content query flow"""
+        rag, mock_store, mock_ai = rag_mocks
+
+        # Configure mocks
+        mock_store.search.return_value = _ML_SEARCH_RESULT
+        mock_store._resolve_course_name.return_value = "ML Course"
+        mock_store.get_lesson_link.return_value = "https://example.com/lesson-0"
+
+        mock_ai.generate_response.return_value = "Machine learning is a subset of AI..."
+
+        # Execute query
+        answer, sources = rag.query("What is machine learning?", session_id="test_1")
+
+        # Verify response
+        assert isinstance(answer, str)
+        assert len(answer) > 0
+
+        # Verify AI generator was called with tools
+        mock_ai.generate_response.assert_called_once_with(
+            query=ANY, conversation_history=ANY, tools=ANY, tool_manager=ANY
+        )
+
+    async def test_content_query_async_flow(self, rag_mocks):
+        """Test that the async query path awaits the async AI generator"""
+        rag, mock_store, mock_ai = rag_mocks
+
+        mock_ai.generate_response_async = AsyncMock(return_value="Async answer")
+        answer, sources = await rag.query_async(
+            "What is machine learning?", session_id="test_async"
+        )
+
+        assert answer == "Async answer"
+        assert isinstance(sources, list)
+        mock_ai.generate_response_async.assert_awaited_once()
+        mock_ai.generate_response.assert_not_called()
+
+        # Each async query searches through its own tool manager
+        tool_manager = mock_ai.generate_response_async.call_args.kwargs["tool_manager"]
+        assert tool_manager is not rag.tool_manager
+
+        # Exchange should be recorded in the session
+        history = rag.session_manager.get_conversation_history("test_async")
+        assert "What is machine learning?" in history
+
+    async def test_async_queries_share_tool_definitions(self, rag_mocks):
+        """Test per-query tool managers still pass one definitions object"""
+        rag, mock_store, mock_ai = rag_mocks
+
+        mock_ai.generate_response_async = AsyncMock(return_value="Answer")
+        await rag.query_async("First question")
+        await rag.query_async("Second question")
+
+        # Same object every time, so the generator's cached copy is reused
+        first, second = mock_ai.generate_response_async.call_args_list
+        assert first.kwargs["tools"] is second.kwargs["tools"]
+        assert first.kwargs["tools"] is rag.tool_manager.get_tool_definitions()
+        assert first.kwargs["tool_manager"] is not second.kwargs["tool_manager"]
+
+    async def test_query_batch(self, rag_mocks):
+        """Test batched queries run concurrently with their own sources"""
+        rag, mock_store, mock_ai = rag_mocks
+
+        async def answer(query, tool_manager, **kwargs):
+            # Let the other queries start before this one records its source
+            await asyncio.sleep(0)
+            tool_manager.tools["search_course_content"].last_sources = [
+                {"text": query, "link": None}
+            ]
+            return f"Answer: {query}"
+
+        mock_ai.generate_response_async = AsyncMock(side_effect=answer)
+        results = await rag.query_batch(["first", "second"], ["batch_1", None])
+
+        assert [a for a, _ in results] == [
+            "Answer: Answer this question about course materials: first",
+            "Answer: Answer this question about course materials: second",
+        ]
+        assert [s[0]["text"] for _, s in results] == [
+            "Answer this question about course materials: first",
+            "Answer this question about course materials: second",
+        ]
+        assert mock_ai.generate_response_async.await_count == 2
+
+        # The shared tool manager is untouched and sessions are still updated
+        assert rag.tool_manager.get_last_sources() == []
+        assert "first" in rag.session_manager.get_conversation_history("batch_1")
+
+    def test_content_query_stream_flow(self, rag_mocks):
+        """Test that streamed chunks are relayed and recorded in the session"""
+        rag, mock_store, mock_ai = rag_mocks
+
+        mock_ai.generate_response_stream.return_value = iter(["Machine ", "learning"])
+        events = list(rag.query_stream("What is ML?", session_id="test_stream"))
+
+        assert events[:2] == [
+            {"type": "text", "text": "Machine "},
+            {"type": "text", "text": "learning"},
+        ]
+        assert events[-1] == {"type": "done", "sources": []}
+
+        # The stream searches through its own tool manager
+        tool_manager = mock_ai.generate_response_stream.call_args.kwargs["tool_manager"]
+        assert tool_manager is not rag.tool_manager
+
+        # Full answer should be recorded in the session
+        history = rag.session_manager.get_conversation_history("test_stream")
+        assert "Assistant: Machine learning" in history
+
+    def test_content_query_with_sources(self, rag_mocks):
+        """Test that sources are returned correctly"""
+        rag, mock_store, mock_ai = rag_mocks
 
-            mock_ai = MockAIGenerator.return_value
-            mock_ai.generate_response.side_effect = Exception("API Error")
+        # Mock the search tool to populate sources
+        rag.search_tool.last_sources = _ML_SOURCES
 
-            rag = RAGSystem(test_config)
+        # Mock AI response
+        mock_ai.generate_response.return_value = "Answer based on course materials"
 
-            # Should raise exception
-            with pytest.raises(Exception) as exc_info:
-                rag.query("Test query", session_id="test_4")
+        # Execute query
+        answer, sources = rag.query("Test query", session_id="test_2")
 
-            assert "API Error" in str(exc_info.value)
+        # Verify sources were returned
+        assert isinstance(sources, list)
+
+    def test_error_propagation(self, rag_mocks):
+        """Test error propagation through the stack"""
+        rag, mock_store, mock_ai = rag_mocks
+
+        mock_ai.generate_response.side_effect = Exception("API Error")
+
+        # Should raise exception
+        with pytest.raises(Exception) as exc_info:
+            rag.query("Test query", session_id="test_4")
+
+        assert "API Error" in str(exc_info.value)
 
 
 class TestRAGSystemSessionManagement:
     """Tests for session and conversation management"""
 
-    def test_session_management(self, test_config):
+    def test_session_management(self, rag_mocks):
         """Test session creation and management"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator") as MockAI,
-            patch("rag_system.DocumentProcessor"),
-        ):
-
-            mock_ai = MockAI.return_value
-            mock_ai.generate_response.return_value = "Answer"
+        rag, mock_store, mock_ai = rag_mocks
 
-            rag = RAGSystem(test_config)
+        mock_ai.generate_response.return_value = "Answer"
 
-            # Query with specific session
-            session_id = "session_123"
-            answer1, _ = rag.query("First question", session_id=session_id)
+        # Query with specific session
+        session_id = "session_123"
+        answer1, _ = rag.query("First question", session_id=session_id)
 
-            # Verify session was used
-            assert mock_ai.generate_response.call_count == 1
+        # Verify session was used
+        assert mock_ai.generate_response.call_count == 1
 
-            # Second query with same session
-            answer2, _ = rag.query("Second question", session_id=session_id)
+        # Second query with same session
+        answer2, _ = rag.query("Second question", session_id=session_id)
 
-            # Verify history was passed on second call
-            second_call_kwargs = mock_ai.generate_response.call_args[1]
-            assert "conversation_history" in second_call_kwargs
+        # Verify history was passed on second call
+        mock_ai.generate_response.assert_called_with(
+            query=ANY,
+            conversation_history=_Contains("First question"),
+            tools=ANY,
+            tool_manager=ANY,
+        )
 
-    def test_conversation_context(self, test_config):
+    def test_conversation_context(self, rag_mocks):
         """Test multi-turn conversation with context"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator") as MockAI,
-            patch("rag_system.DocumentProcessor"),
-        ):
+        rag, mock_store, mock_ai = rag_mocks
 
-            mock_ai = MockAI.return_value
-            mock_ai.generate_response.return_value = "Answer"
+        mock_ai.generate_response.return_value = "Answer"
 
-            rag = RAGSystem(test_config)
-            session_id = "conv_session"
+        session_id = "conv_session"
 
-            # First exchange
-            rag.query("What is supervised learning?", session_id=session_id)
+        # First exchange
+        rag.query("What is supervised learning?", session_id=session_id)
 
-            # Second exchange should include history
-            rag.query("Give me an example", session_id=session_id)
+        # Second exchange should include history
+        rag.query("Give me an example", session_id=session_id)
 
-            # Verify second call included conversation history
-            second_call = mock_ai.generate_response.call_args_list[1]
-            call_kwargs = second_call[1]
+        # Verify second call included conversation history
+        mock_ai.generate_response.assert_called_with(
+            query=ANY,
+            conversation_history=_Contains("What is supervised learning?"),
+            tools=ANY,
+            tool_manager=ANY,
+        )
 
-            assert call_kwargs["conversation_history"] is not None
-            history = call_kwargs["conversation_history"]
-            assert "What is supervised learning?" in history
-
-    def test_concurrent_sessions(self, test_config):
+    def test_concurrent_sessions(self, rag_mocks):
         """Test handling multiple concurrent sessions"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator") as MockAI,
-            patch("rag_system.DocumentProcessor"),
-        ):
+        rag, mock_store, mock_ai = rag_mocks
+
+        mock_ai.generate_response.return_value = "Answer"
+
+        # Create multiple sessions
+        rag.query("Question 1", session_id="session_A")
+        rag.query("Question 2", session_id="session_B")
+        rag.query("Follow-up A", session_id="session_A")
 
-            mock_ai = MockAI.return_value
-            mock_ai.generate_response.return_value = "Answer"
+        # Verify sessions are independent
+        # Session A should have history, session B should be fresh
+        sessions = dict(rag.session_manager.sessions)
+        assert len(sessions["session_A"]) > len(sessions["session_B"]) > 0
 
-            rag = RAGSystem(test_config)
+    def test_threaded_sessions(self):
+        """Test sessions keep every update under concurrent writers"""
+        # Room for every session: eviction order would depend on scheduling
+        manager = SessionManager(max_history=10, max_sessions=200)
 
-            # Create multiple sessions
-            rag.query("Question 1", session_id="session_A")
-            rag.query("Question 2", session_id="session_B")
-            rag.query("Follow-up A", session_id="session_A")
+        def converse(n):
+            for i in range(10):
+                manager.add_exchange(f"thread_{n}", f"Q{i}", f"A{i}")
+                manager.get_conversation_history(f"thread_{n}")
 
-            # Verify sessions are independent
-            # Session A should have history, session B should be fresh
-            assert rag.session_manager.sessions["session_A"] is not None
-            assert rag.session_manager.sessions["session_B"] is not None
-            assert len(rag.session_manager.sessions["session_A"]) > len(
-                rag.session_manager.sessions["session_B"]
-            )
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(converse, range(100)))
+
+        # No update was lost to a race
+        sessions = dict(manager.sessions)
+        assert len(sessions) == 100
+        assert all(len(messages) == 20 for messages in sessions.values())
 
 
 class TestRAGSystemToolIntegration:
     """Tests for tool integration in RAG system"""
 
-    def test_tool_manager_integration(self, test_config):
+    def test_tool_manager_integration(self, rag_mocks):
         """Test that tools are properly registered"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator"),
-            patch("rag_system.DocumentProcessor"),
-        ):
-
-            rag = RAGSystem(test_config)
+        rag, mock_store, mock_ai = rag_mocks
 
-            # Verify tools are registered
-            definitions = rag.tool_manager.get_tool_definitions()
-            assert len(definitions) >= 1
+        # Verify tools are registered
+        definitions = rag.tool_manager.get_tool_definitions()
+        assert len(definitions) >= 1
 
-            # Verify search tool is registered
-            tool_names = [d["name"] for d in definitions]
-            assert "search_course_content" in tool_names
+        # Verify search tool is registered
+        tool_names = [d["name"] for d in definitions]
+        assert "search_course_content" in tool_names
 
-    def test_outline_tool_integration(self, test_config):
+    def test_outline_tool_integration(self, rag_mocks):
         """Test course outline tool integration"""
-        with (
-            patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator"),
-            patch("rag_system.DocumentProcessor"),
-        ):
+        rag, mock_store, mock_ai = rag_mocks
 
-            mock_store = MockVectorStore.return_value
+        # Verify outline tool is registered
+        definitions = rag.tool_manager.get_tool_definitions()
+        tool_names = [d["name"] for d in definitions]
+        assert "get_course_outline" in tool_names
 
-            rag = RAGSystem(test_config)
-
-            # Verify outline tool is registered
-            definitions = rag.tool_manager.get_tool_definitions()
-            tool_names = [d["name"] for d in definitions]
-            assert "get_course_outline" in tool_names
-
-    def test_tool_execution_through_rag(self, test_config):
+    def test_tool_execution_through_rag(self, rag_mocks):
         """Test tool execution through RAG system"""
-        with (
-            patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAI,
-            patch("rag_system.DocumentProcessor"),
-        ):
+        rag, mock_store, mock_ai = rag_mocks
 
-            mock_store = MockVectorStore.return_value
-            mock_ai = MockAI.return_value
+        # Configure mock to simulate tool calling
+        def mock_generate_with_tool(*args, **kwargs):
+            # Simulate tool execution
+            if "tool_manager" in kwargs:
+                tool_mgr = kwargs["tool_manager"]
+                # Execute search tool
+                tool_mgr.execute_tool("search_course_content", query="test")
+            return "Answer using tool results"
 
-            # Configure mock to simulate tool calling
-            def mock_generate_with_tool(*args, **kwargs):
-                # Simulate tool execution
-                if "tool_manager" in kwargs:
-                    tool_mgr = kwargs["tool_manager"]
-                    # Execute search tool
-                    tool_mgr.execute_tool("search_course_content", query="test")
-                return "Answer using tool results"
+        mock_ai.generate_response.side_effect = mock_generate_with_tool
 
-            mock_ai.generate_response.side_effect = mock_generate_with_tool
+        answer, sources = rag.query("Search query", session_id="tool_test")
 
-            rag = RAGSystem(test_config)
-            answer, sources = rag.query("Search query", session_id="tool_test")
-
-            # Verify tool was available
-            assert mock_ai.generate_response.call_count == 1
+        # Verify tool was available
+        assert mock_ai.generate_response.call_count == 1
 
 
 class TestRAGSystemQueryTypes:
     """Tests for different query types"""
 
-    def test_general_knowledge_query(self, test_config):
+    def test_general_knowledge_query(self, rag_mocks):
         """Test query that doesn't require course search"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator") as MockAI,
-            patch("rag_system.DocumentProcessor"),
-        ):
-
-            mock_ai = MockAI.return_value
-            mock_ai.generate_response.return_value = (
-                "General knowledge answer without using tools"
-            )
-
-            rag = RAGSystem(test_config)
-            answer, sources = rag.query("What is 2+2?", session_id="general_test")
-
-            # Should return answer
-            assert isinstance(answer, str)
-            # Sources may be empty if no tool used
-            assert isinstance(sources, list)
-
-    def test_course_specific_query(self, test_config):
-        """Test query requiring course content"""
-        with (
-            patch("rag_system.VectorStore") as MockStore,
-            patch("rag_system.AIGenerator") as MockAI,
-            patch("rag_system.DocumentProcessor"),
-        ):
-
-            mock_store = MockStore.return_value
-            mock_ai = MockAI.return_value
-
-            # Simulate tool use by AI
-            def mock_tool_usage(*args, **kwargs):
-                if "tool_manager" in kwargs:
-                    # Populate sources through tool
-                    kwargs["tool_manager"].tools[
-                        "search_course_content"
-                    ].last_sources = [{"text": "Source", "link": "http://link"}]
-                return "Course-specific answer"
-
-            mock_ai.generate_response.side_effect = mock_tool_usage
-
-            rag = RAGSystem(test_config)
-            answer, sources = rag.query(
-                "What is supervised learning in the ML course?",
-                session_id="course_test",
-            )
-
-            # Should have used tool and returned sources
-            assert isinstance(answer, str)
-
-    def test_outline_query(self, test_config):
-        """Test course outline query"""
-        with (
-            patch("rag_system.VectorStore") as MockStore,
-            patch("rag_system.AIGenerator") as MockAI,
-            patch("rag_system.DocumentProcessor"),
-        ):
-
-            mock_store = MockStore.return_value
-            mock_ai = MockAI.return_value
-
-            # Configure outline tool response
-            mock_store._resolve_course_name.return_value = "ML Course"
-            mock_store.course_catalog = Mock()
-            mock_store.course_catalog.get.return_value = {
-                "metadatas": [
-                    {
-                        "title": "ML Course",
-                        "course_link": "http://link",
-                        "instructor": "Teacher",
-                        "lessons_json": '[{"lesson_number": 0, "lesson_title": "Intro", "lesson_link": "http://lesson"}]',
-                    }
-                ]
-            }
-
-            mock_ai.generate_response.return_value = "Course outline response"
-
-            rag = RAGSystem(test_config)
-            answer, sources = rag.query(
-                "What are the lessons in ML course?", session_id="outline_test"
-            )
-
-            # Should return answer
-            assert isinstance(answer, str)
+        rag, mock_store, mock_ai = rag_mocks
 
+        mock_ai.generate_response.return_value = (
+            "General knowledge answer without using tools"
+        )
 
-class TestRAGSystemEdgeCases:
-    """Tests for edge cases and error conditions"""
+        answer, sources = rag.query("What is 2+2?", session_id="general_test")
 
-    def test_query_without_session_id(self, test_config):
-        """Test query without providing session ID"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator") as MockAI,
-            patch("rag_system.DocumentProcessor"),
-        ):
+        # Should return answer
+        assert isinstance(answer, str)
+        # Sources may be empty if no tool used
+        assert isinstance(sources, list)
 
-            mock_ai = MockAI.return_value
-            mock_ai.generate_response.return_value = "Answer"
+    def test_course_specific_query(self, rag_mocks):
+        """Test query requiring course content"""
+        rag, mock_store, mock_ai = rag_mocks
 
-            rag = RAGSystem(test_config)
-            answer, sources = rag.query("Test query", session_id=None)
+        # Simulate tool use by AI
+        def mock_tool_usage(*args, **kwargs):
+            if "tool_manager" in kwargs:
+                # Populate sources through tool
+                kwargs["tool_manager"].tools[
+                    "search_course_content"
+                ].last_sources = _ML_SOURCES
+            return "Course-specific answer"
 
-            # Should still work (no history used)
-            assert isinstance(answer, str)
+        mock_ai.generate_response.side_effect = mock_tool_usage
 
-    def test_empty_query(self, test_config):
-        """Test handling of empty query"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator") as MockAI,
-            patch("rag_system.DocumentProcessor"),
-        ):
+        answer, sources = rag.query(
+            "What is supervised learning in the ML course?",
+            session_id="course_test",
+        )
 
-            mock_ai = MockAI.return_value
-            mock_ai.generate_response.return_value = "Please provide a question"
+        # Should have used tool and returned sources
+        assert isinstance(answer, str)
 
-            rag = RAGSystem(test_config)
-            answer, sources = rag.query("", session_id="empty_test")
+    def test_outline_query(self, rag_mocks):
+        """Test course outline query"""
+        rag, mock_store, mock_ai = rag_mocks
+
+        # Configure outline tool response
+        mock_store._resolve_course_name.return_value = "ML Course"
+        # Configure the auto child rather than replacing it, so rag_mocks resets it
+        mock_store.course_catalog.get.return_value = {
+            "metadatas": [
+                {
+                    "title": "ML Course",
+                    "course_link": "http://link",
+                    "instructor": "Teacher",
+                    "lessons_json": '[{"lesson_number": 0, "lesson_title": "Intro", "lesson_link": "http://lesson"}]',
+                }
+            ]
+        }
 
-            # Should handle gracefully
-            assert isinstance(answer, str)
+        mock_ai.generate_response.return_value = "Course outline response"
 
-    def test_very_long_query(self, test_config):
-        """Test handling of very long query"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator") as MockAI,
-            patch("rag_system.DocumentProcessor"),
-        ):
+        answer, sources = rag.query(
+            "What are the lessons in ML course?", session_id="outline_test"
+        )
 
-            mock_ai = MockAI.return_value
-            mock_ai.generate_response.return_value = "Answer to long query"
+        # Should return answer
+        assert isinstance(answer, str)
 
-            rag = RAGSystem(test_config)
-            long_query = "What is machine learning? " * 100  # Very long query
 
-            answer, sources = rag.query(long_query, session_id="long_test")
+class TestRAGSystemEdgeCases:
+    """Tests for edge cases and error conditions"""
 
-            # Should handle without error
-            assert isinstance(answer, str)
+    @pytest.mark.parametrize(
+        "query,session_id",
+        [
+            ("Test query", None),
+            ("", "empty_test"),
+            (_LONG_QUERY, "long_test"),
+        ],
+        ids=["no_session", "empty", "very_long"],
+    )
+    def test_edge_case(self, rag_mocks, query, session_id):
+        """Test unusual queries are answered without error"""
+        rag, mock_store, mock_ai = rag_mocks
+
+        mock_ai.generate_response.return_value = "Answer"
+
+        answer, sources = rag.query(query, session_id=session_id)
+
+        # Should handle gracefully; sources may be empty if no tool used
+        assert isinstance(answer, str)
+        assert isinstance(sources, list)
+
+    def test_no_results(self, rag_mocks):
+        """Test a search finding nothing is answered from the empty-result text"""
+        rag, mock_store, mock_ai = rag_mocks
+        mock_store.batch_search.return_value = [SearchResults([], [], [])]
+
+        def search_then_answer(query, tool_manager, **kwargs):
+            # Search the way the generator does, then answer with the result
+            return tool_manager.execute_tools_batch(
+                [("search_course_content", {"query": "Nonexistent topic"})]
+            )[0]
+
+        mock_ai.generate_response.side_effect = search_then_answer
+
+        answer, sources = rag.query("Nonexistent topic", session_id="test_3")
+
+        assert answer == "No relevant content found."
+        assert sources == []
+        mock_store.batch_search.assert_called_once()
+
+    async def test_oversized_query_skips_ai(self, rag_mocks, test_config):
+        """Test queries over the limit are refused without an AI call"""
+        rag, mock_store, mock_ai = rag_mocks
+        query = "x" * (test_config.MAX_QUERY_CHARS + 1)
+
+        assert rag.query(query, session_id="big") == (QUERY_TOO_LONG, [])
+        assert await rag.query_async(query) == (QUERY_TOO_LONG, [])
+        assert list(rag.query_stream(query))[0]["text"] == QUERY_TOO_LONG
+
+        mock_ai.generate_response.assert_not_called()
+        mock_ai.generate_response_async.assert_not_called()
+        mock_ai.generate_response_stream.assert_not_called()
+        assert rag.session_manager.get_conversation_history("big") is None
@@ -223,8 +223,8 @@ class TestToolManager:
         """Test getting all tool definitions"""
         definitions = tool_manager.get_tool_definitions()
 
-        # Should return list of definitions
-        assert isinstance(definitions, list)
+        # Should return a frozen tuple of definitions
+        assert isinstance(definitions, tuple)
         assert len(definitions) >= 1
 
         # Each definition should have required fields
@@ -233,6 +233,24 @@ class TestToolManager:
             assert "description" in definition
             assert "input_schema" in definition
 
+    def test_tool_definitions_reused_until_registration(self, mock_vector_store):
+        """Test that definitions are built once and rebuilt after a new tool"""
+        # Registers a tool, so it gets its own manager rather than the shared one
+        tool_manager = ToolManager()
+        tool_manager.register_tool(CourseSearchTool(mock_vector_store))
+        definitions = tool_manager.get_tool_definitions()
+        assert tool_manager.get_tool_definitions() is definitions
+
+        class ExtraTool(CourseSearchTool):
+            def get_tool_definition(self):
+                return {**super().get_tool_definition(), "name": "extra_tool"}
+
+        tool_manager.register_tool(ExtraTool(mock_vector_store))
+
+        updated = tool_manager.get_tool_definitions()
+        assert updated is not definitions
+        assert [d["name"] for d in updated][-1] == "extra_tool"
+
     def test_execute_tool(self, tool_manager, mock_vector_store):
         """Test tool execution through manager"""
         # Execute tool via manager
@@ -244,6 +262,62 @@ class TestToolManager:
         # Vector store should have been called
         mock_vector_store.search.assert_called()
 
+    def test_execute_tools_batch(self, tool_manager, mock_vector_store):
+        """Test batched searches share one vector store call"""
+        calls = [
+            ("search_course_content", {"query": "first"}),
+            ("search_course_content", {"query": "second", "lesson_number": 1}),
+            ("nonexistent_tool", {"query": "third"}),
+            ("search_course_content", {"query": "fourth"}),
+        ]
+
+        results = tool_manager.execute_tools_batch(calls)
+
+        # One result per call, in call order
+        assert len(results) == 4
+        assert "not found" in results[2].lower()
+        assert "Machine learning is a subset" in results[3]
+
+        # The searches went to the store once, not once per query
+        mock_vector_store.search.assert_not_called()
+        mock_vector_store.batch_search.assert_called_once()
+        kwargs = mock_vector_store.batch_search.call_args.kwargs
+        assert kwargs["queries"] == ["first", "second", "fourth"]
+        assert kwargs["lesson_numbers"] == [None, 1, None]
+
+    def test_execute_tools_batch_collects_sources(
+        self, tool_manager, sample_search_results
+    ):
+        """Test sources from every search in a batch are kept, not just the last"""
+        tool_manager.execute_tools_batch(
+            [
+                ("search_course_content", {"query": "first"}),
+                ("search_course_content", {"query": "second"}),
+            ]
+        )
+
+        sources = tool_manager.get_last_sources()
+        assert len(sources) == 2 * len(sample_search_results.documents)
+
+    def test_execute_tools_batch_malformed_calls(self, tool_manager, mock_vector_store):
+        """Test malformed calls get their own error results"""
+        results = tool_manager.execute_tools_batch(
+            [
+                ("search_course_content", {"course_name": "ML"}),
+                ("search_course_content", None),
+                ("get_course_outline", None),
+                ("search_course_content", {"query": "valid"}),
+            ]
+        )
+
+        # Searches without a query never reach the store
+        assert results[0] == results[1] == "Search call is missing its 'query'"
+        assert mock_vector_store.batch_search.call_args.kwargs["queries"] == ["valid"]
+        assert "Machine learning is a subset" in results[3]
+
+        # A tool that raises gets the exception back in its place
+        assert isinstance(results[2], TypeError)
+
     def test_execute_nonexistent_tool(self, tool_manager):
         """Test executing non-existent tool"""
         result = tool_manager.execute_tool("nonexistent_tool", query="test")
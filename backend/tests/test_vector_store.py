@@ -0,0 +1,145 @@
+"""Unit tests for VectorStore.batch_search against an in-memory Chroma"""
+
+import zlib
+from unittest.mock import Mock, patch
+
+import chromadb
+import pytest
+from chromadb.api.types import EmbeddingFunction
+from models import Course, CourseChunk, Lesson
+
+ML_COURSE = "Introduction to Machine Learning"
+CU_COURSE = "Building Towards Computer Use"
+
+
+class _KeywordEmbedding(EmbeddingFunction):
+    """Bag-of-words embedding so nearest neighbours share words, no model"""
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = [0.0] * 64
+            for word in text.lower().split():
+                vector[zlib.crc32(word.encode()) % 64] += 1.0
+            vectors.append(vector)
+        return vectors
+
+
+@pytest.fixture
+def vector_store():
+    """VectorStore over an ephemeral Chroma client holding two small courses"""
+    from vector_store import VectorStore
+
+    with (
+        patch("vector_store.chromadb.PersistentClient") as client_factory,
+        patch(
+            "vector_store.chromadb.utils.embedding_functions."
+            "SentenceTransformerEmbeddingFunction",
+            return_value=_KeywordEmbedding(),
+        ),
+    ):
+        client_factory.side_effect = lambda path, settings: chromadb.EphemeralClient(
+            settings=settings
+        )
+        store = VectorStore("unused", "unused", max_results=1)
+
+    for title, lessons in (
+        (ML_COURSE, ["gradient descent basics", "supervised learning labels"]),
+        (CU_COURSE, ["screenshots for agents", "clicking through a browser"]),
+    ):
+        store.add_course_metadata(
+            Course(
+                title=title,
+                course_link="https://example.com/course",
+                instructor="Dr. Jane Smith",
+                lessons=[
+                    Lesson(lesson_number=number, title=text)
+                    for number, text in enumerate(lessons)
+                ],
+            )
+        )
+        store.add_course_content(
+            [
+                CourseChunk(
+                    content=text,
+                    course_title=title,
+                    lesson_number=number,
+                    chunk_index=number,
+                )
+                for number, text in enumerate(lessons)
+            ]
+        )
+
+    yield store
+
+    # Ephemeral clients share one in-process system, so drop what we added
+    store.client.delete_collection("course_catalog")
+    store.client.delete_collection("course_content")
+
+
+class TestBatchSearch:
+    """Tests for VectorStore.batch_search()"""
+
+    def test_results_follow_query_order(self, vector_store):
+        """Test each result belongs to the query at the same position"""
+        results = vector_store.batch_search(
+            ["screenshots for agents", "gradient descent", "browser clicking"]
+        )
+
+        assert [r.documents for r in results] == [
+            ["screenshots for agents"],
+            ["gradient descent basics"],
+            ["clicking through a browser"],
+        ]
+        assert all(r.error is None for r in results)
+
+    def test_queries_grouped_by_filter(self, vector_store, monkeypatch):
+        """Test queries sharing a filter are searched in one Chroma call"""
+        content = Mock(wraps=vector_store.course_content)
+        monkeypatch.setattr(vector_store, "course_content", content)
+
+        results = vector_store.batch_search(
+            ["learning", "agents", "learning", "agents"],
+            course_names=[ML_COURSE, None, ML_COURSE, None],
+            lesson_numbers=[1, None, 1, None],
+        )
+
+        # One call per distinct filter, each carrying all of its queries
+        assert content.query.call_count == 2
+        filtered, unfiltered = content.query.call_args_list
+        assert filtered.kwargs["query_texts"] == ["learning", "learning"]
+        assert filtered.kwargs["where"] == {
+            "$and": [{"course_title": ML_COURSE}, {"lesson_number": 1}]
+        }
+        assert unfiltered.kwargs["query_texts"] == ["agents", "agents"]
+        assert unfiltered.kwargs["where"] is None
+
+        # Results are scattered back to their original positions
+        assert results[0].documents == ["supervised learning labels"]
+        assert results[1].documents == ["screenshots for agents"]
+        assert results[2].metadata == results[0].metadata
+        assert results[3].metadata == results[1].metadata
+
+    def test_course_names_resolved_in_one_query(self, vector_store, monkeypatch):
+        """Test partial course names resolve once each, in a single query"""
+        catalog = Mock(wraps=vector_store.course_catalog)
+        monkeypatch.setattr(vector_store, "course_catalog", catalog)
+
+        results = vector_store.batch_search(
+            ["lesson", "lesson", "lesson"],
+            course_names=["Machine Learning", "Computer Use", "Machine Learning"],
+        )
+
+        catalog.query.assert_called_once()
+        assert catalog.query.call_args.kwargs["query_texts"] == [
+            "Machine Learning",
+            "Computer Use",
+        ]
+        assert [r.metadata[0]["course_title"] for r in results] == [
+            ML_COURSE,
+            CU_COURSE,
+            ML_COURSE,
+        ]
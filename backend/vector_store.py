@@ -113,12 +113,100 @@ class VectorStore:
         except Exception as e:
             return SearchResults.empty(f"Search error: {str(e)}")
 
+    def batch_search(
+        self,
+        queries: List[str],
+        course_names: Optional[List[Optional[str]]] = None,
+        lesson_numbers: Optional[List[Optional[int]]] = None,
+        limit: Optional[int] = None,
+    ) -> List[SearchResults]:
+        """
+        Search for several queries at once, one result per query in order.
+
+        Chroma applies a single filter to a whole query call, so queries are
+        grouped by their resolved filter and each group is embedded and
+        searched in one call. Course names are resolved in one catalog query.
+
+        Args:
+            queries: What to search for, one entry per search
+            course_names: Optional course filter per query
+            lesson_numbers: Optional lesson filter per query
+            limit: Maximum results to return per query
+
+        Returns:
+            List of SearchResults aligned with queries
+        """
+        course_names = course_names or [None] * len(queries)
+        lesson_numbers = lesson_numbers or [None] * len(queries)
+        search_limit = limit if limit is not None else self.max_results
+
+        titles = self._resolve_course_names([name for name in course_names if name])
+
+        results: List[Optional[SearchResults]] = [None] * len(queries)
+        groups: Dict[str, List[int]] = {}
+        filters: Dict[str, Optional[Dict]] = {}
+        for i, (course_name, lesson_number) in enumerate(
+            zip(course_names, lesson_numbers, strict=True)
+        ):
+            course_title = titles.get(course_name) if course_name else None
+            if course_name and not course_title:
+                results[i] = SearchResults.empty(
+                    f"No course found matching '{course_name}'"
+                )
+                continue
+            filter_dict = self._build_filter(course_title, lesson_number)
+            key = repr(filter_dict)
+            filters[key] = filter_dict
+            groups.setdefault(key, []).append(i)
+
+        for key, indices in groups.items():
+            try:
+                chroma_results = self.course_content.query(
+                    query_texts=[queries[i] for i in indices],
+                    n_results=search_limit,
+                    where=filters[key],
+                )
+                for row, i in enumerate(indices):
+                    results[i] = SearchResults(
+                        documents=chroma_results["documents"][row],
+                        metadata=chroma_results["metadatas"][row],
+                        distances=chroma_results["distances"][row],
+                    )
+            except Exception as e:
+                for i in indices:
+                    results[i] = SearchResults.empty(f"Search error: {str(e)}")
+
+        return results  # type: ignore[return-value]
+
+    def _resolve_course_names(self, course_names: List[str]) -> Dict[str, str]:
+        """Resolve several course names with one catalog query"""
+        unique_names = list(dict.fromkeys(course_names))
+        if not unique_names:
+            return {}
+        try:
+            results = self.course_catalog.query(
+                query_texts=unique_names, n_results=1, include=["metadatas"]
+            )
+            return {
+                name: metadatas[0]["title"]
+                for name, metadatas in zip(
+                    unique_names, results["metadatas"], strict=True
+                )
+                if metadatas
+            }
+        except Exception as e:
+            print(f"Error resolving course names: {e}")
+            return {}
+
     def _resolve_course_name(self, course_name: str) -> Optional[str]:
         """Use vector search to find best matching course by name"""
         try:
-            results = self.course_catalog.query(query_texts=[course_name], n_results=1)
+            # Only the matched title is needed, so skip documents and distances
+            results = self.course_catalog.query(
+                query_texts=[course_name], n_results=1, include=["metadatas"]
+            )
 
-            if results["documents"][0] and results["metadatas"][0]:
+            if results["metadatas"][0]:
                 # Return the title (which is now the ID)
                 return results["metadatas"][0][0]["title"]
         except Exception as e:
@@ -149,7 +237,7 @@ class VectorStore:
 
     def add_course_metadata(self, course: Course):
         """Add course information to the catalog for semantic search"""
-        import json
+        import orjson
 
         course_text = course.title
 
@@ -171,9 +259,9 @@ class VectorStore:
                     "title": course.title,
                     "instructor": course.instructor,
                     "course_link": course.course_link,
-                    "lessons_json": json.dumps(
+                    "lessons_json": orjson.dumps(
                         lessons_metadata
-                    ),  # Serialize as JSON string
+                    ).decode(),  # Serialize as JSON string
                     "lesson_count": len(course.lessons),
                 }
             ],
@@ -238,7 +326,7 @@ class VectorStore:
 
     def get_all_courses_metadata(self) -> List[Dict[str, Any]]:
         """Get metadata for all courses in the vector store"""
-        import json
+        import orjson
 
         try:
             results = self.course_catalog.get()
@@ -248,7 +336,9 @@ class VectorStore:
                 for metadata in results["metadatas"]:
                     course_meta = metadata.copy()
                     if "lessons_json" in course_meta:
-                        course_meta["lessons"] = json.loads(course_meta["lessons_json"])
+                        course_meta["lessons"] = orjson.loads(
+                            course_meta["lessons_json"]
+                        )
                         del course_meta[
                             "lessons_json"
                         ]  # Remove the JSON string version
@@ -274,7 +364,7 @@ class VectorStore:
 
     def get_lesson_link(self, course_title: str, lesson_number: int) -> Optional[str]:
         """Get lesson link for a given course title and lesson number"""
-        import json
+        import orjson
 
         try:
             # Get course by ID (title is the ID)
@@ -283,7 +373,7 @@ class VectorStore:
                 metadata = results["metadatas"][0]
                 lessons_json = metadata.get("lessons_json")
                 if lessons_json:
-                    lessons = json.loads(lessons_json)
+                    lessons = orjson.loads(lessons_json)
                     # Find the lesson with matching number
                     for lesson in lessons:
                         if lesson.get("lesson_number") == lesson_number:
@@ -0,0 +1,104 @@
+"""File-stat manifest and uv helpers shared by the lint and format runs."""
+
+import hashlib
+import json
+import subprocess
+from pathlib import Path
+
+MANIFEST_PATH = Path(".cache") / "lintmanifest.json"
+
+# Files that can hold ruff, black or mypy settings; a change to any of them
+# invalidates every entry
+CONFIG_FILES = ["pyproject.toml", "ruff.toml", ".ruff.toml", "mypy.ini", ".mypy.ini"]
+
+# tool_versions is the one call per run that lets uv sync the environment;
+# every tool run after it uses this prefix, which skips the lockfile check
+# and sync (--no-sync implies --frozen)
+UV_RUN = ["uv", "run", "--no-sync"]
+
+
+def tool_versions(root_dir: Path, tools: list[str]) -> dict[str, str]:
+    """
+    Installed version of each tool, used to invalidate entries.
+
+    Read from package metadata in one uv-run interpreter rather than one
+    '<tool> --version' process per tool, which would import each tool.
+    """
+    script = (
+        "import sys\n"
+        "from importlib.metadata import version\n"
+        "for tool in sys.argv[1:]:\n"
+        "    print(version(tool))\n"
+    )
+    output = subprocess.check_output(
+        ["uv", "run", "python", "-c", script, *tools], cwd=root_dir, text=True
+    )
+    return dict(zip(tools, output.split(), strict=True))
+
+
+def snapshot(root_dir: Path, targets: list[str]) -> dict[str, list[int]]:
+    """
+    Modification time and size of every Python file under the targets.
+
+    Taken before a tool runs, so edits made while it runs are not recorded
+    as passed.
+    """
+    files: dict[str, list[int]] = {}
+    for target in targets:
+        path = root_dir / target
+        for file in sorted(path.rglob("*.py")) if path.is_dir() else [path]:
+            stat = file.stat()
+            files[file.relative_to(root_dir).as_posix()] = [
+                stat.st_mtime_ns,
+                stat.st_size,
+            ]
+    return files
+
+
+def _config_hash(root_dir: Path) -> str:
+    """Digest of whichever tool config files exist"""
+    digest = hashlib.sha256()
+    for name in CONFIG_FILES:
+        path = root_dir / name
+        if path.is_file():
+            digest.update(name.encode() + b"\0" + path.read_bytes() + b"\0")
+    return digest.hexdigest()
+
+
+def _load(root_dir: Path) -> dict:
+    try:
+        return json.loads((root_dir / MANIFEST_PATH).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def changed_files(
+    root_dir: Path, files: dict[str, list[int]], tool: str, version: str
+) -> list[str]:
+    """
+    Files from a snapshot that the tool has not passed in that state.
+
+    Every file counts as changed when the tool's version or the tool config
+    differs from the one recorded, so upgrades and settings changes re-check
+    the whole tree.
+    """
+    entry = _load(root_dir).get(tool, {})
+    config = _config_hash(root_dir)
+    current = entry.get("version") == version and entry.get("config") == config
+    seen = entry.get("files", {}) if current else {}
+    return [path for path, stat in files.items() if seen.get(path) != stat]
+
+
+def record(
+    root_dir: Path, files: dict[str, list[int]], tool: str, version: str
+) -> None:
+    """Remember a snapshot as passed by the tool"""
+    manifest = _load(root_dir)
+    manifest[tool] = {
+        "version": version,
+        "config": _config_hash(root_dir),
+        "files": files,
+    }
+    manifest_file = root_dir / MANIFEST_PATH
+    manifest_file.parent.mkdir(exist_ok=True)
+    manifest_file.write_text(json.dumps(manifest))
@@ -1,40 +1,124 @@
 #!/usr/bin/env python3
 """Format code using black and ruff."""
 
+import os
+import re
 import subprocess
 import sys
 from pathlib import Path
 
+from _cache import UV_RUN, changed_files, record, snapshot, tool_versions
+
+TARGETS = ["backend", "main.py"]
+
+# Per-file lines: black's "reformatted x.py" / "error: cannot format x.py: ..."
+# and ruff's concise "x.py:1:1: I001 ..."
+BLACK_FILE_LINE = re.compile(
+    r"^(reformatted|error: cannot format) ([^:]+\.py)(?::\s*(.*))?$"
+)
+RUFF_FILE_LINE = re.compile(r"^([^:\s]+\.py):\d+:\d+: (.*)$")
+
+
+def collect(report, tool, output, pattern):
+    """
+    Sort a tool's captured output into per-file messages.
+
+    Lines that name a file are stored once per (path, message) under the
+    report; any other line is returned so it can still be shown.
+    """
+    other = []
+    for line in output.splitlines():
+        match = pattern.match(line)
+        if not match:
+            other.append(line)
+            continue
+        if tool == "black":
+            path, message = match.group(2), match.group(3) or match.group(1)
+        else:
+            path, message = match.group(1), match.group(2)
+        messages = report.setdefault(path, {}).setdefault(tool, [])
+        if message not in messages:
+            messages.append(message)
+    return other
+
+
+def print_report(report):
+    """Print one line per touched file, plus CI annotations when on CI"""
+    for path in sorted(report):
+        tools = report[path]
+        black_status = "; ".join(tools.get("black", [])) or "unchanged"
+        ruff_status = "; ".join(tools.get("ruff", [])) or "ok"
+        summary = f"black={black_status}, ruff={ruff_status}"
+        print(f"  {path}: {summary}")
+        if os.environ.get("CI"):
+            print(f"::notice file={path}::{summary}")
+
 
 def main():
     """Run formatting tools on the codebase."""
     root_dir = Path(__file__).parent.parent
-    backend_dir = root_dir / "backend"
+
+    # One uv run syncs the environment and reads both versions
+    versions = tool_versions(root_dir, ["black", "ruff"])
+    black_version, ruff_version = versions["black"], versions["ruff"]
+
+    report = {}
 
     print("[*] Running black formatter...")
-    result = subprocess.run(
-        ["uv", "run", "black", str(backend_dir), "main.py"],
-        cwd=root_dir,
-        capture_output=False
+    changed = changed_files(
+        root_dir, snapshot(root_dir, TARGETS), "black", black_version
     )
+    if changed:
+        result = subprocess.run(
+            [*UV_RUN, "black", *changed],
+            cwd=root_dir,
+            capture_output=True,
+            text=True,
+        )
+        # Black reports per-file lines on stderr; the rest is its summary
+        for line in collect(report, "black", result.stderr, BLACK_FILE_LINE):
+            print(line)
 
-    if result.returncode != 0:
-        print("[!] Black formatting failed!")
-        sys.exit(1)
+        if result.returncode != 0:
+            print_report(report)
+            print("[!] Black formatting failed!")
+            sys.exit(1)
 
-    print("[+] Black formatting completed!")
+        # Snapshot after formatting: black's output is what later runs see
+        record(root_dir, snapshot(root_dir, TARGETS), "black", black_version)
+        print("[+] Black formatting completed!")
+    else:
+        print("[+] No changes since black last ran")
 
     print("\n[*] Running ruff import sorting and fixes...")
-    result = subprocess.run(
-        ["uv", "run", "ruff", "check", "--fix", "--select", "I", str(backend_dir), "main.py"],
-        cwd=root_dir,
-        capture_output=False
+    changed = changed_files(
+        root_dir, snapshot(root_dir, TARGETS), "ruff-isort", ruff_version
     )
+    if changed:
+        result = subprocess.run(
+            [*UV_RUN, "ruff", "check", "--fix", "--select", "I",
+             "--output-format", "concise", *changed],
+            cwd=root_dir,
+            capture_output=True,
+            text=True,
+        )
+        for line in collect(report, "ruff", result.stdout, RUFF_FILE_LINE):
+            print(line)
+        print(result.stderr, end="", file=sys.stderr)
 
-    if result.returncode != 0:
-        print("[!] Ruff found issues but attempted fixes")
+        if result.returncode != 0:
+            print("[!] Ruff found issues but attempted fixes")
+        else:
+            record(
+                root_dir, snapshot(root_dir, TARGETS), "ruff-isort", ruff_version
+            )
+            print("[+] Ruff fixes completed!")
     else:
-        print("[+] Ruff fixes completed!")
+        print("[+] No changes since ruff last ran")
+
+    if report:
+        print("\nFiles touched:")
+        print_report(report)
 
     print("\n[+] Code formatting complete!")
 
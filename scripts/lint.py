@@ -3,40 +3,76 @@
 
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+from _cache import UV_RUN, changed_files, record, snapshot, tool_versions
 
-def main():
-    """Run linting tools on the codebase."""
-    root_dir = Path(__file__).parent.parent
-    backend_dir = root_dir / "backend"
+TARGETS = ["backend", "main.py"]
 
-    print("[*] Running ruff linter...")
-    result = subprocess.run(
-        ["uv", "run", "ruff", "check", str(backend_dir), "main.py"],
-        cwd=root_dir
-    )
 
-    ruff_passed = result.returncode == 0
+def run_check(root_dir, tool, version, cmd, whole_tree):
+    """
+    Run a check on the files it hasn't passed yet.
 
-    print("\n[*] Running black format check...")
-    result = subprocess.run(
-        ["uv", "run", "black", "--check", str(backend_dir), "main.py"],
-        cwd=root_dir
+    Returns (files, result), with result None when nothing changed. Tools
+    that need the whole tree for context (mypy) still get every target once
+    any file has changed.
+    """
+    files = snapshot(root_dir, TARGETS)
+    changed = changed_files(root_dir, files, tool, version)
+    if not changed:
+        return files, None
+    args = TARGETS if whole_tree else changed
+    return files, subprocess.run(
+        cmd + args, cwd=root_dir, capture_output=True, text=True
     )
 
-    black_passed = result.returncode == 0
 
-    print("\n[*] Running mypy type checker...")
-    result = subprocess.run(
-        ["uv", "run", "mypy", str(backend_dir), "main.py"],
-        cwd=root_dir
-    )
+def main():
+    """Run linting tools on the codebase."""
+    root_dir = Path(__file__).parent.parent
+
+    # One uv run syncs the environment and reads every tool's version
+    versions = tool_versions(root_dir, ["ruff", "black", "mypy"])
+    jobs = [
+        ("ruff linter", "ruff", [*UV_RUN, "ruff", "check"], False),
+        ("black format check", "black", [*UV_RUN, "black", "--check"], False),
+        ("mypy type checker", "mypy", [*UV_RUN, "mypy"], True),
+    ]
 
-    mypy_passed = result.returncode == 0
+    # The tools are independent, so run them at once; output is captured
+    # and printed per tool so it doesn't interleave
+    passed = {}
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        futures = {
+            executor.submit(
+                run_check, root_dir, tool, versions[tool], cmd, whole_tree
+            ): (name, tool)
+            for name, tool, cmd, whole_tree in jobs
+        }
+        for future in as_completed(futures):
+            name, tool = futures[future]
+            files, result = future.result()
+            if result is None:
+                print(f"[*] Skipped {name}: no changes since it last passed\n")
+                passed[name] = True
+                continue
+            print(f"[*] Ran {name}...")
+            print(result.stdout, end="")
+            print(result.stderr, end="", file=sys.stderr)
+            print()
+            passed[name] = result.returncode == 0
+            if passed[name]:
+                # Manifest writes stay on this thread, one tool at a time
+                record(root_dir, files, tool, versions[tool])
+
+    ruff_passed = passed["ruff linter"]
+    black_passed = passed["black format check"]
+    mypy_passed = passed["mypy type checker"]
 
     # Summary
-    print("\n" + "="*50)
+    print("="*50)
     print("Linting Summary:")
     print(f"  Ruff:  {'[+] Passed' if ruff_passed else '[!] Failed'}")
     print(f"  Black: {'[+] Passed' if black_passed else '[!] Failed'}")